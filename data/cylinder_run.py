@@ -10,6 +10,7 @@ from pintFoam.parareal import (parareal, tabulate)
 from pintFoam import (BaseCase, foam, block_mesh)
 from pintFoam.vector import (Vector)
 from pintFoam.foam import (map_fields)
+from pintFoam.memo import (ResultCache)
 from pintFoam.utils import (generate_job_name)
 
 fields = ["p", "U", "pMean", "pPrime2Mean", "U_0", "UMean", "UPrime2Mean"]
@@ -17,6 +18,7 @@ fields = ["p", "U", "pMean", "pPrime2Mean", "U_0", "UMean", "UPrime2Mean"]
 fine_case = BaseCase(Path("c7_fine"), "baseCase", fields=fields)
 coarse_case = BaseCase(Path("c7_coarse"), "baseCase", fields=fields)
 times = np.linspace(0, 500, 51)
+result_cache = ResultCache(Path("c7_cache"), max_bytes=50 << 30)
 
 @delayed
 def gather(*args):
@@ -44,7 +46,8 @@ def fine(n, x, t_0, t_1):
     """Fine integrator."""
     uid = uuid.uuid4()
     return foam("pimpleFoam", 0.1, x, t_0, t_1,
-                job_name=generate_job_name(n, t_0, t_1, uid, "fine", tlength=3))
+                job_name=generate_job_name(n, t_0, t_1, uid, "fine", tlength=3),
+                result_cache=result_cache)
 
 
 @delayed
@@ -52,7 +55,8 @@ def coarse(n, x, t_0, t_1):
     """Coarse integrator."""
     uid = uuid.uuid4()
     return foam("pimpleFoam", 1.0, x, t_0, t_1,
-                job_name=generate_job_name(n, t_0, t_1, uid, "coarse", tlength=3))
+                job_name=generate_job_name(n, t_0, t_1, uid, "coarse", tlength=3),
+                result_cache=result_cache)
 
 
 def time_windows(times, window_size):
@@ -1,5 +1,22 @@
-from .foam import (block_mesh, set_fields, foam)
-from .vector import (Vector, BaseCase)
+"""Parallel-in-time integration of OpenFOAM cases.
+
+Submodules and the names below are imported on first use, so that starting a
+worker process, or a command like `python -m pintFoam.clean`, only pays for
+the modules it actually needs. The attribute `pintFoam.foam` is the function
+`foam`, also after the submodule `pintFoam.foam` has been imported.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from .lazy import lazy_package
+
+if TYPE_CHECKING:
+    from .foam import (block_mesh, set_fields, foam)
+    from .vector import (Vector, BaseCase)
 
 __all__ = ["BaseCase", "Vector", "block_mesh", "set_fields", "foam"]
 
+lazy_package(__name__, {
+    "BaseCase": "vector", "Vector": "vector",
+    "block_mesh": "foam", "set_fields": "foam", "foam": "foam"})
@@ -0,0 +1,182 @@
+"""HDF5 archives of snapshots.
+
+A parareal run writes every snapshot as an OpenFOAM time directory, with a
+separate file for each field, in a separate case. An archive instead stores
+any number of snapshots, for instance a complete parareal trajectory, in a
+single HDF5 file. Every snapshot is a group with one chunked dataset per
+field, so that a single field, or part of it, can be read without touching
+the rest. Like in `pintFoam.packed`, headers, boundary fields and other files
+are stored byte for byte, so that a snapshot can be converted back to an
+OpenFOAM time directory when a solver needs it.
+
+HDF5 files can not be written by several processes at once. All access to an
+archive goes through a lock on a file next to it, `<archive>.lock`: shared
+for reading and exclusive for writing. Since these are `flock` locks, they
+also order threads within a process.
+
+Snapshots in an archive are not removed by a `pintFoam.lifetime.Lifetime`:
+an `H5Vector` has no case directory of its own.
+"""
+from __future__ import annotations
+
+import fcntl
+import json
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, List, Optional, Sequence, Tuple
+from uuid import uuid4
+
+import numpy as np
+
+from .packed import Frame, evaluate_snapshot, remove_source, unpack
+from .vector import BaseCase, Vector, VectorExpr
+
+
+@contextmanager
+def locked(path: Path, shared: bool = False):
+    """Hold the lock of the archive at `path`."""
+    with open(path.with_name(path.name + ".lock"), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def chunk_shape(shape: Tuple[int, ...], itemsize: int, chunk_bytes: int) -> Optional[Tuple[int, ...]]:
+    """Chunks of about `chunk_bytes`, split along cells only."""
+    if not shape or shape[0] == 0:
+        return None
+    row = itemsize * int(np.prod(shape[1:]))
+    return (max(1, min(shape[0], chunk_bytes // row)),) + tuple(shape[1:])
+
+
+def as_bytes(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype=np.uint8)
+
+
+@dataclass
+class H5Vector(VectorExpr):
+    """The snapshot stored in group `name` of the HDF5 file `archive`."""
+    base: BaseCase
+    archive: Path
+    name: str
+    time: str
+
+    @property
+    def fields(self):
+        return self.base.fields
+
+    @property
+    def dirname(self):
+        """Identifies this snapshot in expressions; this is not a directory."""
+        return self.archive / self.name
+
+    def leaves(self):
+        return [self]
+
+    def evaluate(self, data):
+        return data[self.dirname]
+
+    def read_data(self, field, index=()) -> np.ndarray:
+        """Values of `field`, or only those selected by `index`."""
+        import h5py  # type: ignore
+        with locked(self.archive, shared=True), h5py.File(self.archive, "r") as f:
+            return f[self.name]["data"][field][index]
+
+    def files(self) -> List[Tuple[str, bytes, Optional[Frame]]]:
+        import h5py  # type: ignore
+        result: List[Tuple[str, bytes, Optional[Frame]]] = []
+        with locked(self.archive, shared=True), h5py.File(self.archive, "r") as f:
+            g = f[self.name]
+            for entry in json.loads(g.attrs["files"]):
+                rel = entry["path"]
+                if "raw" in entry:
+                    result.append((rel, g[entry["raw"]][()].tobytes(), None))
+                    continue
+                frame = Frame(g["head"][rel][()].tobytes(), np.dtype(entry["dtype"]),
+                              tuple(g["data"][rel].shape), g["tail"][rel][()].tobytes())
+                result.append((rel, b"", frame))
+        return result
+
+    def unpack(self, name: Optional[str] = None) -> Vector:
+        """Convert this snapshot to an OpenFOAM case."""
+        return unpack(self, name)
+
+    def clone(self, name: Optional[str] = None) -> Vector:
+        return self.unpack(name)
+
+    def reduce(self, name: Optional[str] = None, workers: Optional[int] = None) -> Vector:
+        return self.unpack(name)
+
+
+def store(x: VectorExpr, archive: Path, name: Optional[str] = None,
+          chunk_bytes: int = 1 << 20, compression: Optional[str] = None,
+          workers: Optional[int] = None, remove: bool = False) -> H5Vector:
+    """Evaluate `x` and store the result in `archive`, replacing any earlier
+    snapshot of the same name.
+
+    Args:
+        x:          a vector or lazy expression; the first of its leaves
+                    provides everything in the snapshot but the field values.
+        archive:    path of the HDF5 file, which is created if needed.
+        name:       group of the snapshot in the archive, random if not
+                    given. Names may contain slashes.
+        chunk_bytes: approximate size of the chunks of field datasets.
+        compression: HDF5 compression filter for field data, e.g. "gzip".
+        workers:    number of threads used to evaluate fields, see
+                    `pintFoam.vector.field_map`.
+        remove:     delete the case of `x` afterwards, if `x` is a single
+                    vector other than the base case.
+    """
+    import h5py  # type: ignore
+    archive = Path(archive)
+    archive.parent.mkdir(parents=True, exist_ok=True)
+    name = name or uuid4().hex
+    template, files, values = evaluate_snapshot(x, workers=workers)
+
+    with locked(archive), h5py.File(archive, "a") as f:
+        if name in f:
+            del f[name]
+        g = f.create_group(name)
+        g.attrs["time"] = template.time
+        index: List[Any] = []
+        for i, (rel, raw, frame) in enumerate(files):
+            if rel not in values or frame is None:
+                g.create_dataset(f"raw/{i}", data=as_bytes(raw))
+                index.append({"path": rel, "raw": f"raw/{i}"})
+                continue
+            data = values[rel]
+            g.create_dataset(f"data/{rel}", data=data, compression=compression,
+                             chunks=chunk_shape(data.shape, data.itemsize, chunk_bytes))
+            g.create_dataset(f"head/{rel}", data=as_bytes(frame.head))
+            g.create_dataset(f"tail/{rel}", data=as_bytes(frame.tail))
+            index.append({"path": rel, "dtype": frame.dtype.str})
+        g.attrs["files"] = json.dumps(index)
+
+    if remove:
+        remove_source(x)
+    return H5Vector(template.base, archive, name, template.time)
+
+
+def store_trajectory(xs: Sequence[VectorExpr], archive: Path, name: str,
+                     **kwargs) -> List[H5Vector]:
+    """Store a sequence of snapshots as `<name>/0`, `<name>/1`, ... Further
+    arguments are passed to `store`."""
+    return [store(x, archive, f"{name}/{i}", **kwargs) for i, x in enumerate(xs)]
+
+
+def load(archive: Path, base: BaseCase, name: str = "/") -> List[H5Vector]:
+    """All snapshots stored under `name` in `archive`, sorted on time."""
+    import h5py  # type: ignore
+    archive = Path(archive)
+    found: List[H5Vector] = []
+
+    def visit(path, obj):
+        if isinstance(obj, h5py.Group) and "files" in obj.attrs:
+            found.append(H5Vector(base, archive, obj.name.lstrip("/"), str(obj.attrs["time"])))
+
+    with locked(archive, shared=True), h5py.File(archive, "r") as f:
+        f[name].visititems(visit)
+    return sorted(found, key=lambda v: (float(v.time), v.name))
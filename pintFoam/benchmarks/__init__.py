@@ -0,0 +1,113 @@
+"""Benchmarks for pintFoam.
+
+Every benchmark produces a list of records: flat dictionaries with the
+parameters and measurements of a single run. Records are written as JSON
+lines, tagged with the git commit of the working tree, so that results of
+different commits can be collected in a single file and compared.
+
+Benchmarks can be profiled by setting the `PINTFOAM_PROFILE` environment
+variable to a comma separated list of profilers:
+
+- `cprofile`: run `cProfile` and write its statistics to
+  `<name>.prof` in the directory given by `PINTFOAM_PROFILE_DIR` (the
+  current directory by default). Inspect them with `python -m pstats`.
+- `tracemalloc`: trace memory allocations and add the peak allocated memory
+  and the top allocation sites to the record.
+"""
+from __future__ import annotations
+
+import cProfile
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Set
+
+
+Record = Dict[str, Any]
+
+PROFILE_ENV = "PINTFOAM_PROFILE"
+PROFILE_DIR_ENV = "PINTFOAM_PROFILE_DIR"
+profilers = {"cprofile", "tracemalloc"}
+
+
+def git_commit(path: Path = Path(__file__).parent) -> Optional[str]:
+    """Short hash of the commit checked out at `path`, if any."""
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=path,
+                                capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def metadata() -> Record:
+    return {"commit": git_commit(),
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "host": platform.node(),
+            "python": platform.python_version()}
+
+
+def write_records(records: Iterable[Record], output: Optional[Path] = None):
+    """Append records as JSON lines to `output`, or print them to standard
+    output if no file is given."""
+    meta = metadata()
+    lines = "".join(json.dumps({**meta, **r}) + "\n" for r in records)
+    if output is None:
+        print(lines, end="")
+    else:
+        with open(output, "a") as f:
+            f.write(lines)
+
+
+@contextmanager
+def timer(timings: Dict[str, float], name: str):
+    """Add the wall time spent in the context to `timings[name]`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+
+def profile_options() -> Set[str]:
+    """Profilers selected with the `PINTFOAM_PROFILE` environment variable."""
+    options = {o.strip().lower() for o in os.environ.get(PROFILE_ENV, "").split(",")} - {""}
+    unknown = options - profilers
+    if unknown:
+        raise ValueError(f"Unknown profiler(s) in {PROFILE_ENV}: {', '.join(sorted(unknown))}; "
+                         f"choose from {', '.join(sorted(profilers))}.")
+    return options
+
+
+@contextmanager
+def profiling(name: str, record: Record, top: int = 10):
+    """Profile the enclosed code with the profilers selected in the
+    environment, storing the results in `record`."""
+    options = profile_options()
+    profiler = cProfile.Profile() if "cprofile" in options else None
+    if "tracemalloc" in options:
+        tracemalloc.start()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        if "tracemalloc" in options:
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, cProfile.__file__),
+                tracemalloc.Filter(False, tracemalloc.__file__)])
+            record["memory_peak"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            record["memory_top"] = [str(stat) for stat in snapshot.statistics("lineno")[:top]]
+        if profiler is not None:
+            path = Path(os.environ.get(PROFILE_DIR_ENV, ".")) / f"{name}.prof"
+            profiler.dump_stats(path)
+            record["profile"] = str(path)
@@ -0,0 +1,229 @@
+"""Benchmarks of parareal speedup, efficiency and overhead.
+
+We run parareal on the damped harmonic oscillator, with iterated forward
+Euler as coarse (step size 0.1) and fine solver (step size 0.001). To mimic an
+expensive fine solver, such as an OpenFOAM run, every fine call can be given
+an artificial `cost` in seconds. The same problem is run with any of the
+three engines: the sequential `parareal` on lists, `parareal_np` on arrays,
+and the Dask `Parareal` class. Iterations continue until the maximum
+difference between two iterations is below `tolerance`.
+
+Each run is compared against a serial fine integration. For a problem with
+$N$ slices and $P$ workers, if parareal takes $k$ iterations, the
+theoretical speedup is
+
+    S = N τ_F / (N τ_G + k (⌈N/P⌉ τ_F + N τ_G)),
+
+where $τ_F$ and $τ_G$ are the measured times of a single fine and coarse
+run. The sequential engines run all fine solutions one after the other, so
+their achieved speedup is below one; their theoretical speedup shows what
+a parallel run could achieve.
+
+For the Dask engine, we also record the task stream. From that we compute
+the worker utilization, the fraction of the available worker time spent on
+computing tasks, and the scheduler overhead per task. A task can start once
+its dependencies are finished, which the scheduler marks by moving it to
+the processing state, and once its worker thread is done with the previous
+task. The overhead of a task is the time between that moment and the start
+of the task, plus the time spent on transferring and deserializing its
+inputs. Time spent waiting on dependencies, such as the serial chain of
+coarse runs, is not counted.
+
+Usage:
+
+    python -m pintFoam.benchmarks.parareal --engine all --cost 0.01 \\
+        --output parareal.jsonl
+"""
+from __future__ import annotations
+
+import math
+import time
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import argh  # type: ignore
+import numpy as np
+
+from ..parareal.abstract import Solution
+from ..parareal.forward_euler import forward_euler
+from ..parareal.futures import Parareal
+from ..parareal.harmonic_oscillator import harmonic_oscillator
+from ..parareal.iterate_solution import iterate_solution
+from ..parareal.parareal import parareal, parareal_np
+from ..parareal.tabulate_solution import tabulate
+from . import Record, profiling, timer, write_records
+
+
+OMEGA0 = 1.0
+ZETA = 0.5
+H = 0.001
+H_COARSE = 0.1
+T_END = 15.0
+
+engines = ["sequential", "numpy", "futures"]
+
+
+@dataclass
+class Costly:
+    """Solution with an artificial cost: after running `solution`, keep the
+    processor busy until at least `cost` seconds have passed."""
+    solution: Solution
+    cost: float = 0.0
+
+    def __call__(self, y, t_0, t_1):
+        start = time.perf_counter()
+        result = self.solution(y, t_0, t_1)
+        while time.perf_counter() - start < self.cost:
+            pass
+        return result
+
+
+def propagators(cost: float) -> Tuple[Solution, Solution]:
+    system = harmonic_oscillator(OMEGA0, ZETA)
+    coarse = iterate_solution(forward_euler(system), H_COARSE)
+    fine = Costly(iterate_solution(forward_euler(system), H), cost)
+    return coarse, fine
+
+
+def distance(a, b) -> float:
+    return float(np.abs(np.asarray(a) - np.asarray(b)).max())
+
+
+def run_sequential(engine: str, coarse: Solution, fine: Solution, y_0, t,
+                   tolerance: float) -> Tuple[Any, int]:
+    solver = (parareal if engine == "sequential" else parareal_np)(coarse, fine)
+    y = tabulate(coarse, y_0, t)
+    if engine == "sequential":
+        y = list(y)
+    for k in range(1, t.size):
+        y_next = solver(y, t)
+        if distance(y_next, y) <= tolerance:
+            return y_next, k
+        y = y_next
+    return y, t.size - 1
+
+
+def run_futures(client, coarse: Solution, fine: Solution, y_0, t,
+                tolerance: float) -> Tuple[Any, int]:
+    history: List[np.ndarray] = []
+
+    def convergence_test(y):
+        history.append(np.array(y))
+        return len(history) > 1 and distance(history[-1], history[-2]) <= tolerance
+
+    p = Parareal(client, lambda n: coarse, lambda n: fine)
+    result = p.run(y_0, t, convergence_test)
+    return result, len(history) - 1
+
+
+def ready_times(dask_scheduler) -> Dict[Any, float]:
+    """Times at which tasks were moved to the processing state, from the
+    transition log of the scheduler."""
+    ready: Dict[Any, float] = {}
+    for transition in dask_scheduler.transition_log:
+        if transition.finish == "processing":
+            ready[transition.key] = transition.timestamp
+    return ready
+
+
+def task_stream_stats(tasks: List[dict], ready: Dict[Any, float], wall: float,
+                      n_threads: int) -> Record:
+    busy = 0.0
+    overhead = 0.0
+    previous: Dict[Any, float] = {}
+    for task in sorted((task for task in tasks if task.get("startstops")),
+                       key=lambda task: task["startstops"][0]["start"]):
+        startstops = task["startstops"]
+        busy += sum(s["stop"] - s["start"] for s in startstops if s["action"] == "compute")
+        overhead += sum(s["stop"] - s["start"] for s in startstops if s["action"] != "compute")
+        thread = (task["worker"], task.get("thread"))
+        start = startstops[0]["start"]
+        available = max(ready.get(task["key"], start), previous.get(thread, start))
+        overhead += max(0.0, start - available)
+        previous[thread] = startstops[-1]["stop"]
+    return {"n_tasks": len(tasks),
+            "utilization": busy / (wall * n_threads) if wall > 0 else None,
+            "overhead_per_task": overhead / len(tasks) if tasks else None}
+
+
+def theoretical_speedup(n_slices: int, n_workers: int, n_iter: int,
+                        t_fine: float, t_coarse: float) -> float:
+    serial = n_slices * t_fine
+    parallel = n_slices * t_coarse \
+        + n_iter * (math.ceil(n_slices / n_workers) * t_fine + n_slices * t_coarse)
+    return serial / parallel
+
+
+def benchmark(engine: str, slices: int = 30, cost: float = 0.0,
+              tolerance: float = 1e-4, workers: int = 4, client=None) -> Record:
+    """Run a single parareal benchmark and return its record. The futures
+    engine needs a Dask `client` with `workers` single threaded workers."""
+    coarse, fine = propagators(cost)
+    y_0 = np.array([1.0, 0.0])
+    t = np.linspace(0.0, T_END, slices + 1)
+
+    timings: dict = {}
+    with timer(timings, "fine"):
+        y_fine = tabulate(fine, y_0, t)
+    with timer(timings, "coarse"):
+        tabulate(coarse, y_0, t)
+
+    stats: Record = {}
+    with profiling(f"parareal-{engine}-{slices}", stats):
+        if engine == "futures":
+            from dask.distributed import get_task_stream  # type: ignore
+            with get_task_stream(client) as ts:
+                with timer(timings, "parareal"):
+                    result, n_iter = run_futures(client, coarse, fine, y_0, t, tolerance)
+            ready = client.run_on_scheduler(ready_times)
+            stats.update(task_stream_stats(ts.data, ready, timings["parareal"], workers))
+        else:
+            with timer(timings, "parareal"):
+                result, n_iter = run_sequential(engine, coarse, fine, y_0, t, tolerance)
+
+    return {"benchmark": "parareal", "engine": engine,
+            "problem": "expensive" if cost > 0 else "oscillator",
+            "slices": slices, "cost": cost, "tolerance": tolerance,
+            "workers": workers, "iterations": n_iter,
+            "wall_time": timings["parareal"],
+            "fine_serial_time": timings["fine"],
+            "coarse_serial_time": timings["coarse"],
+            "theoretical_speedup": theoretical_speedup(
+                slices, workers, n_iter, timings["fine"] / slices,
+                timings["coarse"] / slices),
+            "speedup": timings["fine"] / timings["parareal"],
+            "efficiency": timings["fine"] / timings["parareal"] / workers,
+            "error": distance(result, y_fine),
+            **stats}
+
+
+@argh.arg("--engine", choices=engines + ["all"], help="parareal engine to run")
+@argh.arg("--slices", help="number of time slices")
+@argh.arg("--cost", help="artificial cost of a fine run, in seconds")
+@argh.arg("--tolerance", help="convergence tolerance between iterations")
+@argh.arg("--workers", help="number of Dask workers")
+@argh.arg("--repeat", help="number of times to repeat every benchmark")
+@argh.arg("--output", help="JSON lines file to append results to")
+def main(engine: str = "all", slices: int = 30, cost: float = 0.0,
+         tolerance: float = 1e-4, workers: int = 4, repeat: int = 1,
+         output: Optional[Path] = None):
+    """Benchmark parareal on the damped harmonic oscillator."""
+    selected = engines if engine == "all" else [engine]
+    client = None
+    if "futures" in selected:
+        from dask.distributed import Client  # type: ignore
+        client = Client(n_workers=workers, threads_per_worker=1)
+
+    try:
+        run = partial(benchmark, slices=slices, cost=cost, tolerance=tolerance,
+                      workers=workers, client=client)
+        write_records((run(e) for e in selected for _ in range(repeat)), output)
+    finally:
+        if client is not None:
+            client.close()
+
+
+if __name__ == "__main__":
+    argh.dispatch_command(main)
@@ -0,0 +1,232 @@
+"""Micro-benchmarks of the `pintFoam.vector` I/O path.
+
+We generate a synthetic OpenFOAM case with a configurable number of cells
+and list of fields, in ASCII or binary format, and time every stage of
+working with vectors separately:
+
+- `new_vector`, `clone`: creating cases and copying snapshots;
+- `parse`: reading the `internalField` of every field from disk, bypassing
+  the field cache;
+- `cached_read`: reading the same data through the field cache;
+- `arithmetic`: computing `a + 2 b` in memory;
+- `write_back`: writing results into a snapshot through `mmap_data`;
+- `gc`: a full garbage collection;
+- `zip_with`, `reduce`, `norm`: the complete vector operations, from disk
+  to disk.
+
+Fields can only be written in place when they are stored in binary format,
+so for ASCII cases only the reading stages are timed.
+
+The generated mesh is not a valid OpenFOAM mesh, but it has the size of one,
+which matters when cases are copied.
+
+Usage:
+
+    python -m pintFoam.benchmarks.vector_io --cells 1000000 \\
+        --fields p,U:vector --format both --output vector_io.jsonl
+
+Set `PINTFOAM_PROFILE=cprofile,tracemalloc` to profile the runs, see
+`pintFoam.benchmarks`.
+"""
+from __future__ import annotations
+
+import gc
+import operator
+import tempfile
+from pathlib import Path
+from shutil import rmtree
+from typing import Dict, List, Optional, Tuple
+
+import argh  # type: ignore
+import numpy as np
+
+from .. import cache
+from ..vector import BaseCase, read_field
+from . import Record, profiling, timer, write_records
+
+
+components = {"scalar": 1, "vector": 3, "symmTensor": 6, "tensor": 9}
+formats = ["ascii", "binary"]
+
+header = """FoamFile
+{{
+    version     2.0;
+    format      ascii;
+    class       {cls};
+    location    "{location}";
+    object      {name};
+}}
+"""
+
+control_dict = header.format(cls="dictionary", location="system", name="controlDict") + """
+application     icoFoam;
+startFrom       startTime;
+startTime       0;
+stopAt          endTime;
+endTime         1;
+deltaT          0.01;
+writeControl    runTime;
+writeInterval   1;
+writeFormat     ascii;
+writePrecision  17;
+writeCompression off;
+timeFormat      general;
+timePrecision   6;
+"""
+
+field_template = """
+dimensions      [0 0 0 0 0 0 0];
+
+internalField   nonuniform List<{dtype}>
+{size}
+(
+{values}
+)
+;
+
+boundaryField
+{{
+    walls
+    {{
+        type            zeroGradient;
+    }}
+}}
+"""
+
+
+def parse_fields(spec: str) -> List[Tuple[str, str]]:
+    """Parse a field list like `p,U:vector` into names and types. The type
+    defaults to `scalar`."""
+    result = []
+    for item in spec.split(","):
+        name, _, dtype = item.strip().partition(":")
+        dtype = dtype or "scalar"
+        if dtype not in components:
+            raise ValueError(f"Unknown field type `{dtype}` for field `{name}`.")
+        result.append((name, dtype))
+    return result
+
+
+def format_list(data: np.ndarray, fmt: str) -> str:
+    if data.ndim == 1:
+        return "\n".join(fmt.format(x) for x in data)
+    return "\n".join("(" + " ".join(fmt.format(x) for x in row) + ")" for row in data)
+
+
+def write_list(path: Path, location: str, cls: str, dtype: str, data: np.ndarray,
+               fmt: str = "{:.17g}"):
+    text = header.format(cls=cls, location=location, name=path.name)
+    if cls.startswith("vol"):
+        text += field_template.format(dtype=dtype, size=len(data), values=format_list(data, fmt))
+    else:
+        text += f"\n{len(data)}\n(\n{format_list(data, fmt)}\n)\n"
+    path.write_text(text)
+
+
+def synthetic_case(root: Path, n_cells: int, fields: List[Tuple[str, str]],
+                   fmt: str = "binary", seed: int = 0) -> BaseCase:
+    """Generate a base case with `n_cells` cells and random field values."""
+    rng = np.random.default_rng(seed)
+    base = root / "baseCase"
+    for d in ["0", "system", "constant/polyMesh"]:
+        (base / d).mkdir(parents=True, exist_ok=True)
+    (base / "system" / "controlDict").write_text(control_dict)
+
+    mesh = base / "constant" / "polyMesh"
+    write_list(mesh / "points", "constant/polyMesh", "vectorField", "vector",
+               rng.random((n_cells, 3)))
+    for name in ["owner", "neighbour"]:
+        write_list(mesh / name, "constant/polyMesh", "labelList", "label",
+                   rng.integers(0, n_cells, 3 * n_cells), fmt="{:d}")
+
+    for name, dtype in fields:
+        k = components[dtype]
+        data = rng.random(n_cells) if k == 1 else rng.random((n_cells, k))
+        cls = "volScalarField" if k == 1 else f"vol{dtype[0].upper()}{dtype[1:]}Field"
+        write_list(base / "0" / name, "0", cls, dtype, data)
+
+    case = BaseCase(root, "baseCase", fields=[name for name, _ in fields])
+    if fmt == "binary":
+        case.set_write_format("binary")
+    elif fmt != "ascii":
+        raise ValueError(f"Unknown format `{fmt}`, choose from {', '.join(formats)}.")
+    return case
+
+
+def run_stages(case: BaseCase, writable: bool = True) -> Dict[str, float]:
+    """Time every stage of the vector I/O path once. Stages that write
+    fields are skipped if not `writable`."""
+    fields = case.fields or []
+    t: Dict[str, float] = {}
+    cache.field_cache.clear()
+
+    with timer(t, "new_vector"):
+        a = case.new_vector()
+    with timer(t, "clone"):
+        b = a.clone()
+    with timer(t, "parse"):
+        for f in fields:
+            read_field(a.dirname / f)
+    for f in fields:
+        a.read_data(f)
+        b.read_data(f)
+    with timer(t, "cached_read"):
+        data = {f: (a.read_data(f), b.read_data(f)) for f in fields}
+    with timer(t, "arithmetic"):
+        result = {f: x + 2 * y for f, (x, y) in data.items()}
+    if writable:
+        c = a.clone()
+        with timer(t, "write_back"):
+            for f in fields:
+                with c.mmap_data(f) as target:
+                    target()[:] = result[f]
+    del data, result
+    with timer(t, "gc"):
+        gc.collect()
+    if writable:
+        with timer(t, "zip_with"):
+            a.zip_with(b, operator.add)
+        with timer(t, "reduce"):
+            (a + 2 * b - c).reduce()
+    with timer(t, "norm"):
+        (a - b).norm()
+
+    case.clean()
+    return t
+
+
+def benchmark(root: Path, cells: int, fields: str = "p,U:vector", fmt: str = "binary",
+              repeat: int = 1) -> List[Record]:
+    """Generate a synthetic case in `root` and time its I/O stages `repeat`
+    times, returning one record for every repetition."""
+    case = synthetic_case(root, cells, parse_fields(fields), fmt)
+    records = []
+    for i in range(repeat):
+        record: Record = {"benchmark": "vector_io", "cells": cells, "fields": fields,
+                          "format": fmt, "run": i}
+        with profiling(f"vector_io-{fmt}-{cells}-{i}", record):
+            timings = run_stages(case, writable=(fmt == "binary"))
+        record.update({f"{stage}_time": t for stage, t in timings.items()})
+        records.append(record)
+    rmtree(case.path)
+    return records
+
+
+@argh.arg("--cells", help="number of cells in the synthetic mesh")
+@argh.arg("--fields", help="comma separated fields, as `name[:type]`")
+@argh.arg("--format", choices=formats + ["both"], help="field file format")
+@argh.arg("--repeat", help="number of times to repeat every benchmark")
+@argh.arg("--root", help="directory to generate cases in (default: temporary)")
+@argh.arg("--output", help="JSON lines file to append results to")
+def main(cells: int = 100000, fields: str = "p,U:vector", format: str = "both",
+         repeat: int = 3, root: Optional[Path] = None, output: Optional[Path] = None):
+    """Benchmark the vector I/O path on a synthetic case."""
+    selected = formats if format == "both" else [format]
+    with tempfile.TemporaryDirectory(dir=root) as tmp:
+        records = [r for fmt in selected
+                   for r in benchmark(Path(tmp) / fmt, cells, fields, fmt, repeat)]
+    write_records(records, output)
+
+
+if __name__ == "__main__":
+    argh.dispatch_command(main)
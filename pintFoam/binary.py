@@ -0,0 +1,121 @@
+"""Binary field I/O.
+
+When OpenFOAM writes fields with `writeFormat binary`, the values of a
+`nonuniform List<...>` are stored as raw floating point numbers, delimited by
+parentheses. Their precision and byte order are given by the `arch` entry in
+the header, for instance `"LSB;label=32;scalar=64"`.
+Such data can be used in place: we only need to locate the `internalField`
+block in the file, after which `numpy.frombuffer` gives a zero-copy view on a
+memory map of the file. Locating the block is a regular expression search on
+the few bytes preceding it, much cheaper than parsing the entire file.
+"""
+from __future__ import annotations
+
+import re
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .cache import Layout
+
+
+components = {b"scalar": 1, b"vector": 3, b"symmTensor": 6, b"tensor": 9}
+
+header_format = re.compile(rb"FoamFile\s*\{[^}]*?\bformat\s+(\w+)\s*;")
+header_arch = re.compile(rb"FoamFile\s*\{[^}]*?\barch\s+\"([^\"]*)\"\s*;")
+internal_field = re.compile(
+    rb"\binternalField\s+nonuniform\s+List<(\w+)>\s*(\d+)\s*\(")
+ascii_list = re.compile(rb"\bnonuniform\s+List<(\w+)>\s*(\d+)\s*\(")
+write_format = re.compile(rb"^(\s*writeFormat\s+)\w+(\s*;)", re.MULTILINE)
+
+
+def file_format(buffer) -> Optional[str]:
+    """Value of the `format` entry in the header of a field file."""
+    m = header_format.search(buffer)
+    return m.group(1).decode() if m else None
+
+
+def scalar_dtype(buffer) -> np.dtype:
+    """Type of binary scalars, from the `arch` entry in the header of a field
+    file, like `"LSB;label=32;scalar=64"`. Without one, we assume native
+    double precision."""
+    m = header_arch.search(buffer)
+    if m is None:
+        return np.dtype(float)
+    entries = dict(e.partition(b"=")[::2] for e in m.group(1).split(b";"))
+    order = "<" if b"LSB" in entries else ">" if b"MSB" in entries else "="
+    size = entries.get(b"scalar", b"64")
+    if size not in (b"32", b"64"):
+        raise ValueError(f"Unsupported scalar size in arch \"{m.group(1).decode()}\".")
+    return np.dtype(f"{order}f{int(size) // 8}")
+
+
+def locate_internal_field(buffer) -> Optional[Layout]:
+    """Offset, dtype and shape of the binary `internalField` data in `buffer`.
+    Returns `None` if the field is uniform or not in binary format."""
+    if file_format(buffer) != "binary":
+        return None
+    m = internal_field.search(buffer)
+    if m is None or m.group(1) not in components:
+        return None
+    n, k = int(m.group(2)), components[m.group(1)]
+    shape: Tuple[int, ...] = (n,) if k == 1 else (n, k)
+    return (m.end(), scalar_dtype(buffer), shape)
+
+
+def binary_data(buffer, layout: Layout) -> np.ndarray:
+    """Zero-copy view on the data described by `layout`."""
+    offset, dtype, shape = layout
+    return np.frombuffer(buffer, dtype=dtype, count=int(np.prod(shape)),
+                         offset=offset).reshape(shape)
+
+
+def has_layout(buffer, layout: Layout) -> bool:
+    """Check that the data at a known offset is still delimited by
+    parentheses, as written by OpenFOAM."""
+    offset, dtype, shape = layout
+    end = offset + int(np.prod(shape)) * dtype.itemsize
+    return buffer[offset-1:offset] == b"(" and buffer[end:end+1] == b")"
+
+
+def ascii_to_binary(path: Path):
+    """Rewrite a field file from ASCII to binary format. All `nonuniform`
+    lists are converted; uniform values are left as they are. Values are
+    written in the precision and byte order given by the `arch` entry."""
+    text = path.read_bytes()
+    header = header_format.search(text)
+    if header is None or header.group(1) != b"ascii":
+        return
+    dtype = scalar_dtype(text)
+
+    # only the value of the `format` entry changes in the header
+    out = [text[:header.start(1)], b"binary"]
+    pos = header.end(1)
+    for m in ascii_list.finditer(text, pos):
+        if m.start() < pos or m.group(1) not in components:
+            continue
+        n, k = int(m.group(2)), components[m.group(1)]
+        end = m.end()
+        # every element of a non-scalar list has its own closing parenthesis
+        for _ in range(n if k > 1 else 0):
+            end = text.index(b")", end) + 1
+        end = text.index(b")", end)
+        values = np.array(text[m.end():end].replace(b"(", b" ").replace(b")", b" ").split(),
+                          dtype=float)
+        if values.size != n * k:
+            raise ValueError(f"Expected {n * k} values in {path}, found {values.size}.")
+        out.extend([text[pos:m.end()], values.astype(dtype).tobytes()])
+        pos = end
+
+    out.append(text[pos:])
+    path.write_bytes(b"".join(out))
+
+
+def set_write_format(control_dict: Path, fmt: str = "binary"):
+    """Set the `writeFormat` entry in a `controlDict`."""
+    text = control_dict.read_bytes()
+    text, n = write_format.subn(rb"\g<1>" + fmt.encode() + rb"\g<2>", text)
+    if n == 0:
+        raise ValueError(f"No writeFormat entry found in {control_dict}.")
+    control_dict.write_bytes(text)
@@ -0,0 +1,180 @@
+"""Process-local cache for parsed field data.
+
+Parsing an OpenFOAM field file is expensive, while the same snapshot is often
+read many times: for arithmetic, convergence checks and diagnostics. The
+`FieldCache` keeps parsed `internalField` arrays in memory, keyed on the
+case path, time, field name and modification time of the file, and evicts the
+least recently used entries once its memory budget is exceeded.
+
+For binary files the cache also remembers where the `internalField` data is
+located, so that `Vector.mmap_data` can map the data without parsing the
+file again. Layouts are kept per snapshot, for at most `max_layouts`
+snapshots, and dropped when a field is invalidated or its case is removed,
+see `forget`.
+
+The cache is shared between threads, see `pintFoam.vector.field_map`. All
+bookkeeping is done under a lock, but fields are loaded outside of it, so
+that several fields can be parsed concurrently.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+
+CacheKey = Tuple[str, str, str, int]
+Layout = Tuple[int, np.dtype, Tuple[int, ...]]
+
+
+def case_name(path) -> str:
+    """Identifies a case in the cache; this does not access the file system."""
+    return os.path.abspath(path)
+
+
+@dataclass
+class FieldData:
+    """Parsed content of a field file.
+
+    Attributes:
+        data:   read-only copy of the `internalField` values.
+        offset: byte offset of the binary `internalField` data inside the
+                file, or `None` if the field is not stored in binary format.
+    """
+    data: np.ndarray
+    offset: Optional[int] = None
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes
+
+
+@dataclass
+class FieldCache:
+    """LRU cache of `FieldData`, limited to `max_bytes` of array data, and
+    of the layouts of at most `max_layouts` snapshots."""
+    max_bytes: int = 1 << 30
+    max_layouts: int = 4096
+    hits: int = 0
+    misses: int = 0
+    nbytes: int = 0
+    _entries: OrderedDict = field(default_factory=OrderedDict, repr=False)
+    _layouts: OrderedDict = field(default_factory=OrderedDict, repr=False)
+    _lock: threading.RLock = field(default_factory=threading.RLock, repr=False, compare=False)
+
+    @staticmethod
+    def key(path: Path, time: str, name: str) -> CacheKey:
+        mtime = os.stat(path / time / name).st_mtime_ns
+        return (case_name(path), time, name, mtime)
+
+    def lookup(self, key: CacheKey) -> Optional[FieldData]:
+        """Retrieve an entry without loading it, counting hits and misses."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry
+
+    def insert(self, key: CacheKey, entry: FieldData):
+        entry.data.setflags(write=False)
+        with self._lock:
+            if entry.offset is not None:
+                self._set_layouts(key[:2], {key[2]: (entry.offset, entry.data.dtype,
+                                                     entry.data.shape)})
+            self.discard(key)
+            if entry.nbytes > self.max_bytes:
+                return
+            self._entries[key] = entry
+            self.nbytes += entry.nbytes
+            while self.nbytes > self.max_bytes:
+                _, old = self._entries.popitem(last=False)
+                self.nbytes -= old.nbytes
+
+    def get(self, key: CacheKey, load: Callable[[], FieldData]) -> FieldData:
+        """Retrieve an entry, calling `load` on a cache miss."""
+        entry = self.lookup(key)
+        if entry is None:
+            entry = load()
+            self.insert(key, entry)
+        return entry
+
+    def _set_layouts(self, snapshot: Tuple[str, str], layouts: Dict[str, Layout]):
+        with self._lock:
+            self._layouts.setdefault(snapshot, {}).update(layouts)
+            self._layouts.move_to_end(snapshot)
+            while len(self._layouts) > self.max_layouts:
+                self._layouts.popitem(last=False)
+
+    def layout(self, path: Path, time: str, name: str) -> Optional[Layout]:
+        """Offset, dtype and shape of binary `internalField` data, if known."""
+        snapshot = (case_name(path), time)
+        with self._lock:
+            layouts = self._layouts.get(snapshot)
+            if layouts is None:
+                return None
+            self._layouts.move_to_end(snapshot)
+            return layouts.get(name)
+
+    def copy_layouts(self, source: Path, target: Path, time: str):
+        """Register the layouts known for a snapshot with a byte-for-byte copy
+        of that snapshot in another case."""
+        snapshot = (case_name(source), time)
+        with self._lock:
+            layouts = self._layouts.get(snapshot)
+            if layouts:
+                self._layouts.move_to_end(snapshot)
+                self._set_layouts((case_name(target), time), dict(layouts))
+
+    def discard(self, key: CacheKey):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.nbytes -= entry.nbytes
+
+    def invalidate(self, path: Path, time: str, name: str):
+        """Remove all entries for a given field file, regardless of its
+        modification time, together with its layout. Call this after mutating
+        a file in place."""
+        snapshot = (case_name(path), time)
+        with self._lock:
+            for key in [k for k in self._entries if k[:3] == (*snapshot, name)]:
+                self.discard(key)
+            self._layouts.get(snapshot, {}).pop(name, None)
+
+    def forget(self, *paths: Path):
+        """Remove everything that is known about the cases at `paths`. Call
+        this when cases are deleted."""
+        names = {case_name(p) for p in paths}
+        with self._lock:
+            for key in [k for k in self._entries if k[0] in names]:
+                self.discard(key)
+            for snapshot in [s for s in self._layouts if s[0] in names]:
+                del self._layouts[snapshot]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._layouts.clear()
+            self.nbytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses,
+                "entries": len(self), "nbytes": self.nbytes,
+                "max_bytes": self.max_bytes}
+
+
+field_cache = FieldCache()
@@ -0,0 +1,127 @@
+"""Fast `controlDict` writer.
+
+Every `foam` run sets the time controls in the `controlDict` of a fresh case.
+Parsing and rewriting the dictionary with PyFoam is slow, and writing it in
+place can leave a truncated file behind. Instead, we read the `controlDict` of
+the base case once, and turn it into a `Template`: the original text, split
+at the values of the time-control entries. Rendering only joins strings, and
+the result is written to a temporary file that is then renamed over the
+target, so that a reader never sees a partial file.
+
+Only entries at the top level of the dictionary are replaced; entries of the
+same name in sub-dictionaries, like those of function objects, are left
+alone. Time controls that are missing from the base case are appended.
+"""
+from __future__ import annotations
+
+import os
+import re
+import stat
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+
+time_controls = ("startFrom", "startTime", "endTime", "deltaT",
+                 "writeControl", "writeInterval")
+
+token = re.compile(rb"""
+      (?P<comment> //[^\n]* | /\*.*?\*/ )
+    | (?P<string> "(?:[^"\\]|\\.)*" )
+    | (?P<open> \{ )
+    | (?P<close> \} )
+    | (?P<key> \b\w+ ) [ \t]+ (?P<value> [^;{}"\n]*? ) [ \t]* ;
+    """, re.VERBOSE | re.DOTALL)
+
+
+@dataclass(frozen=True)
+class Template:
+    """Text of a `controlDict`, split at the values of the time controls:
+    `fragments[i]` precedes the value of `keys[i]`."""
+    fragments: Tuple[bytes, ...]
+    keys: Tuple[str, ...]
+
+    def render(self, values: Dict[str, Any]) -> bytes:
+        missing = set(self.keys) - set(values)
+        if missing:
+            raise KeyError(f"No value given for {', '.join(sorted(missing))}.")
+        out = [self.fragments[0]]
+        for key, fragment in zip(self.keys, self.fragments[1:]):
+            out.extend([format_value(values[key]).encode(), fragment])
+        return b"".join(out)
+
+
+def format_value(value: Any) -> str:
+    if isinstance(value, (float, int)) and not isinstance(value, bool):
+        return repr(float(value))
+    return str(value)
+
+
+def template(text: bytes, keys=time_controls) -> Template:
+    """Split the text of a `controlDict` at the values of the top-level
+    entries in `keys`."""
+    fragments: List[bytes] = []
+    found: List[str] = []
+    depth = 0
+    pos = 0
+    for m in token.finditer(text):
+        if m.group("open"):
+            depth += 1
+        elif m.group("close"):
+            depth -= 1
+        elif m.group("key") and depth == 0 and m.group("key").decode() in keys:
+            fragments.append(text[pos:m.start("value")])
+            found.append(m.group("key").decode())
+            pos = m.end("value")
+    rest = text[pos:]
+    for key in keys:
+        if key not in found:
+            if not rest.endswith(b"\n"):
+                rest += b"\n"
+            fragments.append(rest + f"{key:<16}".encode())
+            found.append(key)
+            rest = b";\n"
+    fragments.append(rest)
+    return Template(tuple(fragments), tuple(found))
+
+
+templates: Dict[Path, Tuple[Tuple[int, int], Template]] = {}
+templates_lock = threading.Lock()
+
+
+def load_template(path: Path) -> Template:
+    """Template of the `controlDict` at `path`. Templates are cached until
+    the file changes."""
+    path = Path(path).resolve()
+    info = path.stat()
+    stamp = (info.st_mtime_ns, info.st_size)
+    with templates_lock:
+        cached = templates.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+    result = template(path.read_bytes())
+    with templates_lock:
+        templates[path] = (stamp, result)
+    return result
+
+
+def atomic_write(path: Path, data: bytes):
+    """Write `data` to a temporary file next to `path`, then rename it. The
+    file keeps the permissions of the file it replaces."""
+    mode = stat.S_IMODE(path.stat().st_mode) if path.exists() else 0o644
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        os.chmod(tmp, mode)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def write_control_dict(path: Path, template: Template, **values):
+    """Render `template` with the given time controls and write it to `path`."""
+    atomic_write(path, template.render(values))
@@ -1,27 +1,39 @@
 # ~\~ language=Python filename=pintFoam/foam.py
 # ~\~ begin <<lit/cylinder.md|pintFoam/foam.py>>[init]
-import subprocess
 import math
+from shutil import rmtree
 from typing import Optional, Union
 
-from .vector import (BaseCase, Vector, parameter_file, get_times)
+from .vector import (BaseCase, Vector, VectorExpr, parameter_file, get_times)
+from .session import SolverSession
+from .control_dict import write_control_dict
+from .memo import ResultCache
+from . import (cache, instrument)
 
 # ~\~ begin <<lit/cylinder.md|pintfoam-map-fields>>[init]
-def map_fields(source: Vector, target: BaseCase, consistent=True, map_method=None) -> Vector:
+def map_fields(source: VectorExpr, target: BaseCase, consistent=True, map_method=None) -> Vector:
     """Wrapper for OpenFOAM's mapFields
 
     Use consistent=False if the initial and final boundaries differ.
     Valid arguments for `map_method`: mapNearest, interpolate, cellPointInterpolate
     """
+    x = source.materialize()
     result = target.new_vector()
-    result.time = source.time
+    result.time = x.time
     arg_lst = ["mapFields"]
     if consistent:
         arg_lst.append("-consistent")
     if map_method is not None:
         arg_lst.extend(["-mapMethod", map_method])
-    arg_lst.extend(["-sourceTime", source.time, source.path.resolve()])
-    subprocess.run(arg_lst, cwd=result.path, check=True)
+    arg_lst.extend(["-sourceTime", x.time, x.path.resolve()])
+    try:
+        with instrument.record("map_fields", result.case, source=x.case, time=x.time) as event, \
+             event.writes(result.path):
+            instrument.run(arg_lst, event, cwd=result.path)
+    finally:
+        if x is not source:
+            rmtree(x.path)
+            cache.field_cache.forget(x.path)
     (result.path / "0").rename(result.dirname)
     return result
 # ~\~ end
@@ -32,69 +44,98 @@ def set_fields(v, *, default_field_values, regions):
     x['defaultFieldValues'] = default_field_values
     x['regions'] = regions
     x.writeFile()
-    subprocess.run("setFields", cwd=v.path, check=True)
+    with instrument.record("set_fields", v.path.name) as event, event.writes(v.path):
+        instrument.run("setFields", event, cwd=v.path)
 # ~\~ end
 # ~\~ begin <<lit/cylinder.md|pintfoam-block-mesh>>[init]
 def block_mesh(case: BaseCase):
     """Wrapper for OpenFOAM's blockMesh."""
-    subprocess.run("blockMesh", cwd=case.path, check=True)
+    with instrument.record("block_mesh", case.case) as event, event.writes(case.path):
+        instrument.run("blockMesh", event, cwd=case.path)
 # ~\~ end
 # ~\~ begin <<lit/cylinder.md|pintfoam-epsilon>>[init]
 epsilon = 1e-6
 # ~\~ end
 # ~\~ begin <<lit/cylinder.md|pintfoam-solution>>[init]
-def foam(solver: str, dt: float, x: Vector, t_0: float, t_1: float,
+def foam(solver: str, dt: float, x: VectorExpr, t_0: float, t_1: float,
          write_interval: Optional[float] = None,
          job_name: Optional[str] = None,
-         write_control: str = "runTime") -> Vector:
+         write_control: str = "runTime",
+         session: Optional[SolverSession] = None,
+         result_cache: Optional[ResultCache] = None) -> Vector:
     """Call an OpenFOAM code.
 
     Args:
         solver: The name of the solver (e.g. "icoFoam", "scalarTransportFoam" etc.)
         dt:     deltaT parameter
-        x:      initial state
+        x:      initial state; lazy expressions are evaluated first
         t_0:    startTime (should match that in initial state)
         t_1:    endTime
         write_interval: if not given, this is computed so that only the endTime
                 is written.
+        session: if given, the job is sent to this persistent solver worker,
+                instead of starting `solver` anew. A `ValueError` is raised if
+                the session was started for another solver or base case.
+        result_cache: if given, the result of an identical earlier call is
+                copied from this cache instead of running the solver.
 
     Returns:
         The `Vector` representing the end state.
     """
     # ~\~ begin <<lit/cylinder.md|pintfoam-solution-function>>[init]
-    assert abs(float(x.time) - t_0) < epsilon, f"Times should match: {t_0} != {x.time}."
-    y = x.clone(job_name)
-    write_interval = write_interval or (t_1 - t_0)
-    # ~\~ begin <<lit/cylinder.md|set-control-dict>>[init]
-    backup = open(y.path / "system" / "controlDict", "r").read()
-    for i in range(5):   # this sometimes fails, so we try a few times, maybe disk sync issue?
-        try:
-            print(f"Attempt {i+1} at writing controlDict")
-            controlDict = parameter_file(y, "system/controlDict")
-            controlDict.content['startFrom'] = "latestTime"
-            controlDict.content['startTime'] = float(t_0)
-            controlDict.content['endTime'] = float(t_1)
-            controlDict.content['deltaT'] = float(dt)
-            controlDict.content['writeInterval'] = float(write_interval)
-            controlDict.content['writeControl'] = write_control
-            controlDict.writeFile()
-            break
-        except Exception as e:
-            exception = e
-            open(y.path / "system" / "controlDict", "w").write(backup)
-    else:
-        raise exception
-
-    # ~\~ end
-    # ~\~ begin <<lit/cylinder.md|run-solver>>[init]
-    with open(y.path / "log.stdout", "w") as logfile, \
-         open(y.path / "log.stderr", "w") as errfile:
-        subprocess.run(solver, cwd=y.path, check=True, stdout=logfile, stderr=errfile)
-    # ~\~ end
-    # ~\~ begin <<lit/cylinder.md|return-result>>[init]
-    t1_str = get_times(y.path)[-1]
-    return Vector(y.base, y.case, t1_str)
-    # ~\~ end
+    if session is not None:
+        session.check(solver, x.leaves()[0].base.path)
+    with instrument.record("foam", solver=solver, t_0=t_0, t_1=t_1, dt=dt) as event:
+        with event.phase("reduce"):
+            x_0 = x.materialize(job_name)
+        assert abs(float(x_0.time) - t_0) < epsilon, f"Times should match: {t_0} != {x_0.time}."
+        write_interval = write_interval or (t_1 - t_0)
+        # ~\~ begin <<lit/cylinder.md|lookup-result>>[init]
+        if result_cache is not None:
+            with event.phase("cache"):
+                key = result_cache.key(
+                    x_0, solver=solver, dt=float(dt), t_0=float(t_0), t_1=float(t_1),
+                    write_interval=float(write_interval), write_control=write_control)
+                cached = result_cache.lookup(key, x_0.base, job_name)
+            event.info["cached"] = cached is not None
+            if cached is not None:
+                if x_0 is not x:
+                    rmtree(x_0.dirname if x_0.case == cached.case else x_0.path)
+                    cache.field_cache.forget(x_0.path)
+                event.case = cached.case
+                return cached
+        # ~\~ end
+        with event.phase("clone"):
+            y = x_0.clone(job_name) if x_0 is x else x_0
+        event.case = y.case
+        with event.phase("control_dict"):
+            # ~\~ begin <<lit/cylinder.md|set-control-dict>>[init]
+            write_control_dict(
+                y.path / "system" / "controlDict", y.base.control_dict_template(),
+                startFrom="latestTime", startTime=float(t_0), endTime=float(t_1),
+                deltaT=float(dt), writeInterval=float(write_interval),
+                writeControl=write_control)
+            # ~\~ end
+        with event.writes(y.path):
+            # ~\~ begin <<lit/cylinder.md|run-solver>>[init]
+            if session is not None:
+                with event.phase("solve"):
+                    session.run(y.path, t_0, t_1, dt, write_interval, write_control)
+            else:
+                with open(y.path / "log.stdout", "w") as logfile, \
+                     open(y.path / "log.stderr", "w") as errfile:
+                    instrument.run(solver, event, cwd=y.path, stdout=logfile, stderr=errfile,
+                                   phase="solve", startup_marker="Starting time loop")
+            # ~\~ end
+        # ~\~ begin <<lit/cylinder.md|return-result>>[init]
+        with event.phase("get_times"):
+            t1_str = get_times(y.path)[-1]
+        result = Vector(y.base, y.case, t1_str)
+        if result_cache is not None:
+            with event.phase("cache"):
+                result_cache.insert(key, result)
+        return result
+        # ~\~ end
     # ~\~ end
 # ~\~ end
 # ~\~ end
@@ -0,0 +1,262 @@
+"""Structured instrumentation of OpenFOAM calls.
+
+Every call to `foam`, `map_fields`, `block_mesh` or `set_fields` produces an
+`Event`: the kind of call, the case it worked on, the wall time spent in each
+of its phases, the peak resident set size and CPU time of the child process,
+and the number of bytes it added to the case directory.
+
+Events are sent to all registered sinks. A `MemorySink` collects them in a
+list, a `JsonLinesSink` appends them to a file. If the `PINTFOAM_EVENTS`
+environment variable is set, events are appended to the file it names; this
+also works for Dask workers, which inherit the environment. When no sinks are
+registered, the bookkeeping is skipped as much as possible.
+
+The `summary` function groups events by parareal iteration, which is read
+from the case name as generated by `pintFoam.utils.generate_job_name`.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import subprocess
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import (IO, Any, Callable, Dict, Iterable, Iterator, List,
+                    Optional, Protocol, Sequence, Union)
+
+
+EVENTS_ENV = "PINTFOAM_EVENTS"
+
+
+@dataclass
+class Event:
+    """Record of a single OpenFOAM call.
+
+    Attributes:
+        kind:    name of the call, e.g. `foam` or `map_fields`.
+        case:    name of the case that was written to.
+        start:   time of the start of the call, in seconds since the epoch.
+        phases:  wall time in seconds spent in each phase of the call.
+        max_rss: peak resident set size of the child process(es), in KiB.
+        cpu_time: user and system CPU time of the child process(es).
+        bytes_written: growth of the case directory, in bytes.
+        info:    additional call arguments, like the solver and time interval.
+        error:   representation of the exception, if the call failed.
+    """
+    kind: str
+    case: str
+    start: float = field(default_factory=time.time)
+    phases: Dict[str, float] = field(default_factory=dict)
+    max_rss: Optional[int] = None
+    cpu_time: Optional[float] = None
+    bytes_written: int = 0
+    info: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def wall_time(self) -> float:
+        return sum(self.phases.values())
+
+    @contextmanager
+    def phase(self, name: str):
+        """Add the wall time spent in the context to the phase `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    @contextmanager
+    def writes(self, path: Path):
+        """Add the growth of the directory `path` during the context to
+        `bytes_written`. Does nothing if no sinks are registered."""
+        if not enabled():
+            yield
+            return
+        before = directory_size(path)
+        try:
+            yield
+        finally:
+            self.bytes_written += directory_size(path) - before
+
+    def add_rusage(self, usage):
+        self.max_rss = max(self.max_rss or 0, usage.ru_maxrss)
+        self.cpu_time = (self.cpu_time or 0.0) + usage.ru_utime + usage.ru_stime
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "wall_time": self.wall_time}
+
+
+class Sink(Protocol):
+    def emit(self, event: Event):
+        ...
+
+
+@dataclass
+class MemorySink:
+    """Collects events in memory."""
+    events: List[Event] = field(default_factory=list)
+
+    def emit(self, event: Event):
+        self.events.append(event)
+
+
+@dataclass
+class JsonLinesSink:
+    """Appends events to a file, one JSON object per line."""
+    path: Path
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def emit(self, event: Event):
+        line = json.dumps(event.to_dict()) + "\n"
+        with self.lock, open(self.path, "a") as f:
+            f.write(line)
+
+
+sinks: List[Sink] = []
+if os.environ.get(EVENTS_ENV):
+    sinks.append(JsonLinesSink(Path(os.environ[EVENTS_ENV])))
+
+
+def enabled() -> bool:
+    return bool(sinks)
+
+
+def add_sink(sink: Sink):
+    sinks.append(sink)
+
+
+def remove_sink(sink: Sink):
+    sinks.remove(sink)
+
+
+@contextmanager
+def collect() -> Iterator[MemorySink]:
+    """Collect all events emitted within the context."""
+    sink = MemorySink()
+    add_sink(sink)
+    try:
+        yield sink
+    finally:
+        remove_sink(sink)
+
+
+def emit(event: Event):
+    for sink in list(sinks):
+        sink.emit(event)
+
+
+@contextmanager
+def record(kind: str, case: Union[str, Path] = "", **info) -> Iterator[Event]:
+    """Create an event for the enclosed call, emitting it on exit, also if
+    the call fails."""
+    event = Event(kind, str(case), info=info)
+    try:
+        yield event
+    except Exception as e:
+        event.error = repr(e)
+        raise
+    finally:
+        emit(event)
+
+
+def directory_size(path: Path) -> int:
+    """Total size of the files in `path`, not following symbolic links."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except FileNotFoundError:
+                pass
+    return total
+
+
+def run(args: Union[str, Sequence[Union[str, Path]]], event: Event, *, cwd: Path,
+        stdout: Optional[IO] = None, stderr: Optional[IO] = None,
+        phase: str = "run", startup_marker: Optional[str] = None):
+    """Run a child process like `subprocess.run(..., check=True)`, adding its
+    wall time to `phase` and its resource usage to `event`.
+
+    If `startup_marker` is given, the standard output of the child is scanned
+    for a line containing it, and the time until then is recorded in the phase
+    `startup` instead. OpenFOAM solvers print "Starting time loop" once the
+    mesh and fields are read. Output is still copied to `stdout`."""
+    start = time.perf_counter()
+    process: subprocess.Popen
+    if startup_marker is None:
+        process = subprocess.Popen(args, cwd=cwd, stdout=stdout, stderr=stderr)
+    else:
+        process = subprocess.Popen(args, cwd=cwd, stdout=subprocess.PIPE, stderr=stderr,
+                                   text=True, errors="replace")
+    try:
+        if startup_marker is not None:
+            assert process.stdout is not None
+            for line in process.stdout:
+                if stdout is not None:
+                    stdout.write(line)
+                if startup_marker in line and "startup" not in event.phases:
+                    event.phases["startup"] = time.perf_counter() - start
+    finally:
+        # always reap the child, also if copying its output failed
+        if process.stdout is not None:
+            process.stdout.close()
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+    event.phases[phase] = event.phases.get(phase, 0.0) \
+        + time.perf_counter() - start - event.phases.get("startup", 0.0)
+    event.add_rusage(usage)
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, args)
+
+
+def iteration_of(event: Event) -> Optional[int]:
+    """Parareal iteration of an event, taken from a case name generated by
+    `generate_job_name`."""
+    m = re.match(r"(\d+)-", Path(event.case).name)
+    return int(m.group(1)) if m else None
+
+
+def summary(events: Iterable[Event],
+            key: Callable[[Event], Any] = iteration_of) -> Dict[Any, Dict[str, Any]]:
+    """Aggregate events per group, by default per parareal iteration: the
+    number of calls of each kind, total time of each phase, total wall and
+    CPU time, peak RSS, bytes written and number of failures."""
+    groups: Dict[Any, Dict[str, Any]] = {}
+    for event in events:
+        g = groups.setdefault(key(event), {
+            "calls": defaultdict(int), "phases": defaultdict(float),
+            "wall_time": 0.0, "cpu_time": 0.0, "max_rss": 0,
+            "bytes_written": 0, "errors": 0})
+        g["calls"][event.kind] += 1
+        for name, t in event.phases.items():
+            g["phases"][name] += t
+        g["wall_time"] += event.wall_time
+        g["cpu_time"] += event.cpu_time or 0.0
+        g["max_rss"] = max(g["max_rss"], event.max_rss or 0)
+        g["bytes_written"] += event.bytes_written
+        g["errors"] += event.error is not None
+    for g in groups.values():
+        g["calls"] = dict(g["calls"])
+        g["phases"] = dict(g["phases"])
+    return groups
+
+
+def report(events: Iterable[Event],
+           key: Callable[[Event], Any] = iteration_of) -> str:
+    """Human readable table of the `summary` of events."""
+    lines = []
+    for k, g in sorted(summary(events, key).items(), key=lambda kv: (kv[0] is None, kv[0])):
+        calls = ", ".join(f"{n} {kind}" for kind, n in sorted(g["calls"].items()))
+        phases = ", ".join(f"{name} {t:.3f}s" for name, t in g["phases"].items())
+        lines.append(
+            f"iteration {k if k is not None else '-'}: {calls}; wall {g['wall_time']:.3f}s, "
+            f"cpu {g['cpu_time']:.3f}s, peak rss {g['max_rss'] / 1024:.1f} MiB, "
+            f"written {g['bytes_written'] / 2**20:.1f} MiB, errors {g['errors']}\n"
+            f"    {phases}")
+    return "\n".join(lines)
@@ -0,0 +1,51 @@
+"""Packages with attributes that are imported on first use (PEP 562).
+
+A package calls `lazy_package(__name__, attributes)` at the end of its
+`__init__.py`, where `attributes` maps every lazily imported name to the
+submodule that defines it. Any other submodule is imported when it is first
+accessed as an attribute.
+"""
+from __future__ import annotations
+
+import importlib
+import sys
+import types
+from typing import Dict
+
+
+class LazyPackage(types.ModuleType):
+    """Module type of packages set up by `lazy_package`."""
+    _lazy_attributes: Dict[str, str] = {}
+
+    def __getattr__(self, name: str):
+        if name in self._lazy_attributes:
+            submodule = importlib.import_module(f".{self._lazy_attributes[name]}", self.__name__)
+            value = getattr(submodule, name)
+            self.__dict__[name] = value
+            return value
+        try:
+            return importlib.import_module(f".{name}", self.__name__)
+        except ModuleNotFoundError as e:
+            if e.name != f"{self.__name__}.{name}":
+                raise
+            raise AttributeError(
+                f"module {self.__name__!r} has no attribute {name!r}") from None
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) | set(self.__dict__.get("__all__", [])))
+
+    def __setattr__(self, name, value):
+        # Importing a submodule sets it as an attribute of its package; the
+        # submodule `pintFoam.foam` would then hide the function `foam`.
+        if isinstance(value, types.ModuleType) and name in self._lazy_attributes \
+                and value.__name__ == f"{self.__name__}.{name}":
+            return
+        super().__setattr__(name, value)
+
+
+def lazy_package(name: str, attributes: Dict[str, str]):
+    """Import the `attributes` of package `name` from their submodules when
+    they are first used."""
+    module = sys.modules[name]
+    module.__dict__["_lazy_attributes"] = attributes
+    module.__class__ = LazyPackage
@@ -0,0 +1,63 @@
+"""Lifetime management of vector case directories.
+
+Every `foam`, `map_fields` and vector operation writes a new case directory,
+and nothing is ever removed until `BaseCase.clean()` removes all of them. In
+a parareal run, most of these cases are intermediates: once an iteration is
+complete, the fine and coarse results of the iteration before are no longer
+needed. The `Parareal` class keeps track of the futures it creates for every
+iteration, and hands the cases of the ones that can no longer be reached to a
+`Lifetime`, which deletes them. This keeps the disk footprint proportional
+to the number of time slices, instead of slices times iterations.
+
+A case is never deleted if it is still referenced by a live vector, if it was
+pinned, or if it is the base case itself. Vectors are identified by their
+case path, so this works for any vector type that has `path` and `base`
+attributes; other values, like numpy arrays, are ignored.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from shutil import rmtree
+from typing import Any, Iterable, Optional, Set
+
+from .cache import field_cache
+
+
+def case_path(x: Any) -> Optional[str]:
+    """Case directory of a vector, or `None` if `x` has no case of its own."""
+    path = getattr(x, "path", None)
+    base = getattr(x, "base", None)
+    if path is None or base is None or Path(path) == Path(base.path):
+        return None
+    return str(Path(path).resolve())
+
+
+@dataclass
+class Lifetime:
+    """Deletes the case directories of released vectors.
+
+    Attributes:
+        pinned:  case paths that are never deleted, see `pin`.
+        deleted: case paths that were deleted so far.
+    """
+    pinned: Set[str] = field(default_factory=set)
+    deleted: Set[str] = field(default_factory=set)
+
+    def pin(self, *vectors):
+        """Keep the cases of `vectors`, for instance a final solution that is
+        used after the run."""
+        self.pinned.update(p for p in map(case_path, vectors) if p is not None)
+
+    def release(self, dead: Iterable[Optional[str]], live: Iterable[Optional[str]]) -> int:
+        """Delete the cases in `dead`, except those that are `live` or pinned.
+        Returns the number of deleted cases."""
+        keep = set(live) | self.pinned
+        n = 0
+        for path in set(dead) - keep - {None}:
+            assert path is not None
+            rmtree(path, ignore_errors=True)
+            field_cache.forget(Path(path))
+            self.deleted.add(path)
+            n += 1
+        return n
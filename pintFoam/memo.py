@@ -0,0 +1,165 @@
+"""Content-addressed cache of solver results.
+
+A call to `foam` is fully determined by the solver and its time controls, the
+`system` and `constant` directories of the base case, and the files of the
+initial snapshot. After a restart, or when the same window is propagated
+again, the result of an earlier identical call can be reused instead of
+running the solver. The `ResultCache` stores result snapshots on disk, under
+a key that is the SHA-256 hash of all of these.
+
+The `constant` directory holds the mesh, which can be large. The digest of
+the base case is therefore kept in memory, and only computed again when the
+size or modification time of one of its files changes.
+
+Every entry is a directory `<key>` containing the result snapshot and a file
+`entry.json` with its time. Entries are written to a temporary directory
+first and then renamed, so that several processes can share one cache. The
+modification time of `entry.json` is updated on every hit; once the total
+size of the cache exceeds `max_bytes`, the least recently used entries are
+removed.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from shutil import copytree, rmtree
+from typing import Dict, List, Optional, Tuple
+
+from .instrument import directory_size
+from .vector import BaseCase, Vector
+
+
+ENTRY = "entry.json"
+
+_base_digests: Dict[Path, Tuple[tuple, bytes]] = {}
+
+
+def touch(path: Path):
+    """Set the modification time of `path` to now. File systems may update
+    timestamps with a coarse clock, so we pass the time explicitly."""
+    now = time.time_ns()
+    os.utime(path, ns=(now, now))
+
+
+def hash_file(h, path: Path, chunk_size: int = 1 << 20):
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            h.update(chunk)
+
+
+def hash_files(h, root: Path, files: List[Path]):
+    for f in files:
+        h.update(str(f.relative_to(root)).encode() + b"\0")
+        hash_file(h, f)
+
+
+def base_digest(base: BaseCase) -> bytes:
+    """Digest of the files in the `system` and `constant` directories of
+    `base`, cached until one of them changes."""
+    files = sorted(p for d in ("system", "constant")
+                   for p in (base.path / d).rglob("*") if p.is_file())
+    signature = tuple((str(f), s.st_size, s.st_mtime_ns) for f in files
+                      for s in [f.stat()])
+    path = base.path.resolve()
+    cached = _base_digests.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    h = hashlib.sha256()
+    hash_files(h, base.path, files)
+    _base_digests[path] = (signature, h.digest())
+    return h.digest()
+
+
+@dataclass
+class ResultCache:
+    """On-disk LRU cache of `foam` results, limited to `max_bytes`."""
+    path: Path
+    max_bytes: int = 10 << 30
+    hits: int = field(default=0, compare=False)
+    misses: int = field(default=0, compare=False)
+
+    def __post_init__(self):
+        self.path = Path(self.path)
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def key(self, x: Vector, **params) -> str:
+        """Hash of all files in snapshot `x`, the `system` and `constant`
+        directories of its base case, and the given run parameters."""
+        h = hashlib.sha256()
+        h.update(json.dumps({"base": str(x.base.path.resolve()), **params},
+                            sort_keys=True, default=str).encode())
+        h.update(base_digest(x.base))
+        hash_files(h, x.dirname, sorted(p for p in x.dirname.rglob("*") if p.is_file()))
+        return h.hexdigest()
+
+    def lookup(self, key: str, base: BaseCase, name: Optional[str] = None) -> Optional[Vector]:
+        """Copy the cached result for `key` into a new case of `base`. Returns
+        `None` on a cache miss."""
+        entry = self.path / key
+        try:
+            snapshot = json.loads((entry / ENTRY).read_text())["time"]
+            touch(entry / ENTRY)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        y = Vector(base, base.new_case(name), snapshot)
+        rmtree(y.dirname, ignore_errors=True)
+        try:
+            copytree(entry / snapshot, y.dirname)
+        except FileNotFoundError:   # evicted by another process in the meantime
+            rmtree(y.dirname, ignore_errors=True)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return y
+
+    def insert(self, key: str, y: Vector):
+        """Store the snapshot `y` as the result for `key`."""
+        if (self.path / key).exists():
+            return
+        tmp = Path(tempfile.mkdtemp(dir=self.path, prefix=".tmp-"))
+        copytree(y.dirname, tmp / y.time)
+        (tmp / ENTRY).write_text(json.dumps({"time": y.time}))
+        touch(tmp / ENTRY)
+        try:
+            tmp.rename(self.path / key)
+        except OSError:             # inserted by another process
+            rmtree(tmp, ignore_errors=True)
+        self.evict()
+
+    def entries(self) -> List[Tuple[int, int, Path]]:
+        """Last use, size and path of all entries, least recently used first."""
+        result = []
+        for p in self.path.iterdir():
+            try:
+                result.append(((p / ENTRY).stat().st_mtime_ns, directory_size(p), p))
+            except (FileNotFoundError, NotADirectoryError):
+                pass
+        return sorted(result)
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in
+        `max_bytes`."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in entries:
+            if total <= self.max_bytes:
+                break
+            rmtree(p, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        for p in self.path.iterdir():
+            rmtree(p, ignore_errors=True)
+
+    @property
+    def stats(self):
+        entries = self.entries()
+        return {"hits": self.hits, "misses": self.misses, "entries": len(entries),
+                "nbytes": sum(size for _, size, _ in entries),
+                "max_bytes": self.max_bytes}
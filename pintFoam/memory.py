@@ -0,0 +1,146 @@
+"""Vectors held in memory.
+
+Every `Vector` is a case on disk, so that each parareal update `c1 + f1 - c2`
+clones a case and writes all of its fields, and every convergence check reads
+them again. A `FieldVector` holds the `internalField` values of all fields
+as numpy arrays, together with the rest of the snapshot (headers, boundary
+fields and other files) as bytes. Arithmetic between `FieldVector`s is done
+in memory, field by field, and gives a new `FieldVector`; mixed with other
+vector types it builds the usual lazy expressions. A `FieldVector` is only
+written to an OpenFOAM case by `materialize`, which `foam` and `map_fields`
+call on their input.
+
+The arrays are contiguous and read-only. Pickled with protocol 5, as Dask
+does, they are passed as out-of-band buffers, without copies.
+
+Use `in_memory` to wrap a solver, so that its results are loaded into a
+`FieldVector` (and its case is removed), for instance:
+
+    Parareal(client, lambda n: in_memory(coarse(n)), lambda n: in_memory(fine(n)))
+"""
+from __future__ import annotations
+
+import operator
+from dataclasses import dataclass, field, replace
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+import numpy as np
+
+from .packed import Frame, evaluate_snapshot, remove_source, unpack
+from .vector import BaseCase, Vector, VectorExpr, field_map
+
+
+def frozen(a: np.ndarray) -> np.ndarray:
+    a = np.ascontiguousarray(a)
+    a.setflags(write=False)
+    return a
+
+
+@dataclass
+class FieldVector(VectorExpr):
+    """A snapshot held in memory.
+
+    Attributes:
+        base:   the base case.
+        time:   time of the snapshot.
+        data:   values of the `internalField` of every field.
+        content: all files in the snapshot, see `pintFoam.packed.snapshot_files`;
+                the contents of fields in `data` are left out.
+    """
+    base: BaseCase
+    time: str
+    data: Dict[str, np.ndarray]
+    content: List[Tuple[str, bytes, Optional[Frame]]] = field(repr=False)
+    key: str = field(init=False, repr=False, compare=False,
+                     default_factory=lambda: uuid4().hex)
+
+    def __post_init__(self):
+        self.data = {k: frozen(v) for k, v in self.data.items()}
+
+    @staticmethod
+    def load(x: VectorExpr, workers: Optional[int] = None, remove: bool = False) -> FieldVector:
+        """Evaluate `x` into memory. If `remove` is set, the case of `x` is
+        deleted afterwards, if `x` is a single vector other than the base
+        case."""
+        template, files, values = evaluate_snapshot(x, workers=workers)
+        files = [(rel, b"" if rel in values and frame is not None else raw, frame)
+                 for rel, raw, frame in files]
+        result = FieldVector(template.base, template.time, values, files)
+        if remove:
+            remove_source(x)
+        return result
+
+    @property
+    def fields(self):
+        return self.base.fields
+
+    @property
+    def dirname(self):
+        """Identifies this snapshot in expressions; this is not a directory."""
+        return Path("<memory>") / self.key
+
+    def leaves(self):
+        return [self]
+
+    def evaluate(self, data):
+        return data[self.dirname]
+
+    def read_data(self, field) -> np.ndarray:
+        return self.data[field]
+
+    def files(self) -> List[Tuple[str, bytes, Optional[Frame]]]:
+        return self.content
+
+    def reduce(self, name: Optional[str] = None,  # type: ignore[override]
+               workers: Optional[int] = None) -> FieldVector:
+        return self
+
+    def materialize(self, name: Optional[str] = None) -> Vector:
+        """Write this snapshot to a new OpenFOAM case."""
+        return unpack(self, name)
+
+    def clone(self, name: Optional[str] = None) -> Vector:
+        return self.materialize(name)
+
+    def zip_with(self, other: FieldVector, op, workers: Optional[int] = None) -> FieldVector:
+        names = list(self.data)
+        values = field_map(lambda f: op(self.data[f], other.data[f]), names, workers)
+        return replace(self, data=dict(zip(names, values)))
+
+    def map(self, f, workers: Optional[int] = None) -> FieldVector:
+        names = list(self.data)
+        values = field_map(lambda k: f(self.data[k]), names, workers)
+        return replace(self, data=dict(zip(names, values)))
+
+    def norm(self, workers: Optional[int] = None) -> float:
+        return max((float(np.abs(a).max(initial=0.0)) for a in self.data.values()),
+                   default=0.0)
+
+    def __add__(self, other):
+        if isinstance(other, FieldVector):
+            return self.zip_with(other, operator.add)
+        return super().__add__(other)
+
+    def __sub__(self, other):
+        if isinstance(other, FieldVector):
+            return self.zip_with(other, operator.sub)
+        return super().__sub__(other)
+
+    def __mul__(self, scale: float) -> FieldVector:
+        return self.map(partial(operator.mul, scale))
+
+    def __rmul__(self, scale: float) -> FieldVector:
+        return self.map(partial(operator.mul, scale))
+
+
+def solve_in_memory(solution: Callable[..., Any], *args, **kwargs) -> FieldVector:
+    return FieldVector.load(solution(*args, **kwargs), remove=True)
+
+
+def in_memory(solution: Callable[..., Any]) -> Callable[..., FieldVector]:
+    """Wrap a solver, such that its result is loaded into memory and its case
+    is removed."""
+    return partial(solve_in_memory, solution)
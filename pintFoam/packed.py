@@ -0,0 +1,268 @@
+"""Compact storage of snapshots.
+
+Every intermediate `Vector` is a complete OpenFOAM case, with fields stored
+in double precision. Many intermediates of a parareal run, like the coarse
+results that only enter the correction `c1 + f1 - c2`, need not be more
+accurate than the parareal tolerance. A `PackedVector` stores a snapshot in a
+single `.npz` file inside its own case directory, optionally with the field
+values rounded to single precision, and each array compressed with one of
+the `codecs`. The `zstd` and `blosc` codecs need the `zstandard` and `blosc`
+packages, which are imported when used.
+
+Only the `internalField` values are converted; everything else in the
+snapshot, headers, boundary fields and other files, is stored byte for byte.
+A `PackedVector` takes part in lazy arithmetic like any other vector. It is
+expanded to an OpenFOAM case only when it is reduced, which is what `foam` and
+`map_fields` do with their input.
+
+Packing requires fields in binary format, see `BaseCase.set_write_format`.
+"""
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from shutil import rmtree
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from uuid import uuid4
+
+import numpy as np
+
+from .binary import locate_internal_field
+from .cache import field_cache
+from .lifetime import case_path
+from .vector import BaseCase, Vector, VectorExpr, field_map
+
+
+META = "meta"
+
+
+def zstd_codec(level: int = 3) -> Tuple[Callable, Callable]:
+    import zstandard  # type: ignore
+    return (zstandard.ZstdCompressor(level=level).compress,
+            zstandard.ZstdDecompressor().decompress)
+
+
+def blosc_codec() -> Tuple[Callable, Callable]:
+    import blosc  # type: ignore
+    return (lambda b: blosc.compress(b, cname="zstd"), blosc.decompress)
+
+
+codecs: Dict[str, Callable[[], Tuple[Callable, Callable]]] = {
+    "zlib": lambda: (zlib.compress, zlib.decompress),
+    "zstd": zstd_codec,
+    "blosc": blosc_codec,
+}
+
+
+def get_codec(name: Optional[str]) -> Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]:
+    """Compression and decompression functions of a codec; `None` stores
+    data as is."""
+    if name is None:
+        return (bytes, bytes)
+    if name not in codecs:
+        raise ValueError(f"Unknown codec {name!r}, choose from {sorted(codecs)}.")
+    return codecs[name]()
+
+
+@dataclass
+class Frame:
+    """A field file split around its binary `internalField` data."""
+    head: bytes
+    dtype: np.dtype
+    shape: Tuple[int, ...]
+    tail: bytes
+
+
+def split_field(raw: bytes) -> Optional[Frame]:
+    layout = locate_internal_field(raw)
+    if layout is None:
+        return None
+    offset, dtype, shape = layout
+    end = offset + int(np.prod(shape)) * dtype.itemsize
+    return Frame(raw[:offset], dtype, shape, raw[end:])
+
+
+def snapshot_files(x: Any) -> Iterator[Tuple[str, bytes, Optional[Frame]]]:
+    """Relative path, contents and frame of every file in the snapshot of
+    `x`. Stored snapshots, those that have a `files` method, leave out the
+    contents of framed fields."""
+    if hasattr(x, "files"):
+        yield from x.files()
+        return
+    for p in sorted(x.dirname.rglob("*")):
+        if p.is_file():
+            raw = p.read_bytes()
+            yield str(p.relative_to(x.dirname)), raw, split_field(raw)
+
+
+def evaluate_snapshot(x: VectorExpr, convert: Callable[[np.ndarray], Any] = np.asarray,
+                      workers: Optional[int] = None) \
+        -> Tuple[Any, List[Tuple[str, bytes, Optional[Frame]]], Dict[str, Any]]:
+    """Evaluate `x` field by field, without writing an OpenFOAM case.
+    Returns the first leaf of `x`, the files in its snapshot, and the values
+    of every field passed through `convert`."""
+    leaves = x.leaves()
+    template = leaves[0]
+    fields = sorted(x.fields or [])
+    files = list(snapshot_files(template))
+    for rel, _, frame in files:
+        if rel in fields and frame is None:
+            raise ValueError(f"Field {rel} of {template.dirname} is not in binary format.")
+
+    def evaluate_field(rel):
+        data = {v.dirname: v.read_data(rel) for v in leaves}
+        return convert(np.asarray(x.evaluate(data)))
+
+    return template, files, dict(zip(fields, field_map(evaluate_field, fields, workers)))
+
+
+def unpack(x: Any, name: Optional[str] = None) -> Vector:
+    """Expand a stored snapshot to an OpenFOAM case."""
+    y = Vector(x.base, x.base.new_case(name), x.time)
+    rmtree(y.dirname, ignore_errors=True)
+    for rel, raw, frame in x.files():
+        target = y.dirname / rel
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with open(target, "wb") as f:
+            if frame is None:
+                f.write(raw)
+            else:
+                f.write(frame.head)
+                f.write(np.ascontiguousarray(x.read_data(rel), dtype=frame.dtype).tobytes())
+                f.write(frame.tail)
+    return y
+
+
+def remove_source(x: VectorExpr):
+    """Delete the case of `x`, if `x` is a single vector other than the
+    base case."""
+    leaves = x.leaves()
+    if len(leaves) == 1 and leaves[0] is x:
+        path = case_path(x)
+        if path is not None:
+            rmtree(path, ignore_errors=True)
+            field_cache.forget(Path(path))
+
+
+@dataclass
+class PackedVector(VectorExpr):
+    """A snapshot stored in `<root>/<case>/<time>.npz`."""
+    base: BaseCase
+    case: str
+    time: str
+
+    @property
+    def path(self):
+        return self.base.root / self.case
+
+    @property
+    def fields(self):
+        return self.base.fields
+
+    @property
+    def dirname(self):
+        """The file containing this snapshot. Like the `dirname` of a
+        `Vector`, this identifies the snapshot in expressions."""
+        return self.path / f"{self.time}.npz"
+
+    def leaves(self):
+        return [self]
+
+    def evaluate(self, data):
+        return data[self.dirname]
+
+    def read_data(self, field) -> np.ndarray:
+        """Field values, converted back to their original precision."""
+        with np.load(self.dirname) as blob:
+            meta = json.loads(blob[META].tobytes())
+            entry = meta["files"][field]
+            _, decompress = get_codec(meta["codec"])
+            data = np.frombuffer(decompress(blob[entry["data"]].tobytes()),
+                                 dtype=entry["storage"])
+            return data.reshape(entry["shape"]).astype(entry["dtype"])
+
+    def files(self) -> Iterator[Tuple[str, bytes, Optional[Frame]]]:
+        with np.load(self.dirname) as blob:
+            meta = json.loads(blob[META].tobytes())
+            _, decompress = get_codec(meta["codec"])
+            for name, entry in meta["files"].items():
+                if "data" not in entry:
+                    yield name, decompress(blob[entry["raw"]].tobytes()), None
+                    continue
+                frame = Frame(decompress(blob[entry["head"]].tobytes()),
+                              np.dtype(entry["dtype"]), tuple(entry["shape"]),
+                              decompress(blob[entry["tail"]].tobytes()))
+                yield name, b"", frame
+
+    def unpack(self, name: Optional[str] = None) -> Vector:
+        """Expand this snapshot to an OpenFOAM case."""
+        return unpack(self, name)
+
+    def clone(self, name: Optional[str] = None) -> Vector:
+        return self.unpack(name)
+
+    def reduce(self, name: Optional[str] = None, workers: Optional[int] = None) -> Vector:
+        return self.unpack(name)
+
+
+def pack(x: VectorExpr, name: Optional[str] = None, dtype: Optional[Any] = np.float32,
+         codec: Optional[str] = None, workers: Optional[int] = None,
+         remove: bool = False) -> PackedVector:
+    """Evaluate `x` and store the result as a `PackedVector`.
+
+    Args:
+        x:      a vector or lazy expression; the first of its leaves provides
+                everything in the snapshot but the field values.
+        name:   case name of the result, random if not given.
+        dtype:  precision in which field values are stored, or `None` to
+                keep the original precision.
+        codec:  compression of the stored data, one of `codecs` or `None`.
+        workers: number of threads used to evaluate fields, see
+                `pintFoam.vector.field_map`.
+        remove: delete the case of `x` afterwards, if `x` is a single vector
+                other than the base case.
+    """
+    compress, _ = get_codec(codec)
+
+    def pack_field(values):
+        return compress(values.astype(dtype or values.dtype).tobytes()), values.dtype
+
+    template, files, packed = evaluate_snapshot(x, pack_field, workers)
+    arrays: Dict[str, Any] = {}
+    meta: Dict[str, Any] = {"time": template.time, "codec": codec, "files": {}}
+
+    def store(data: bytes) -> str:
+        key = f"a{len(arrays)}"
+        arrays[key] = np.frombuffer(data, dtype=np.uint8)
+        return key
+
+    for rel, raw, frame in files:
+        if rel not in packed or frame is None:
+            meta["files"][rel] = {"raw": store(compress(raw))}
+            continue
+        data, value_dtype = packed[rel]
+        meta["files"][rel] = {
+            "head": store(compress(frame.head)), "tail": store(compress(frame.tail)),
+            "data": store(data), "dtype": frame.dtype.str, "shape": list(frame.shape),
+            "storage": np.dtype(dtype or value_dtype).str}
+    arrays[META] = np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8)
+
+    y = PackedVector(template.base, name or uuid4().hex, template.time)
+    y.path.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=y.path, prefix=".tmp-", suffix=".npz")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, y.dirname)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+    if remove:
+        remove_source(x)
+    return y
+
@@ -1,8 +1,17 @@
 # ~\~ language=Python filename=pintFoam/parareal/__init__.py
 # ~\~ begin <<lit/parareal.md|pintFoam/parareal/__init__.py>>[init]
-from .tabulate_solution import tabulate
-from .parareal import parareal
-from . import abstract
+from __future__ import annotations
 
-__all__ = ["tabulate", "parareal", "schedule", "abstract"]
+from typing import TYPE_CHECKING
+
+from ..lazy import lazy_package
+
+if TYPE_CHECKING:
+    from .tabulate_solution import tabulate
+    from .parareal import parareal
+    from . import abstract
+
+__all__ = ["tabulate", "parareal", "abstract"]
+
+lazy_package(__name__, {"tabulate": "tabulate_solution", "parareal": "parareal"})
 # ~\~ end
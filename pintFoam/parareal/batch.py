@@ -0,0 +1,29 @@
+# ~\~ language=Python filename=pintFoam/parareal/batch.py
+# ~\~ begin <<lit/parareal.md|parareal-batch>>[init]
+from .abstract import (Problem, Solution)
+from typing import Any
+import numpy as np
+
+Array = Any
+
+def forward_euler(f: Problem) -> Solution:
+    """Forward-Euler solver, advancing a stack of states `y[j]` from
+    `t_0[j]` to `t_1[j]`. The problem `f` should work on stacked states."""
+    def step(y: Array, t_0: Array, t_1: Array) -> Array:
+        """Stepping function of Euler method."""
+        return y + np.asarray(t_1 - t_0)[..., None] * f(y, t_0)
+    return step
+# ~\~ end
+# ~\~ begin <<lit/parareal.md|parareal-batch>>[1]
+def iterate_solution(step: Solution, h: float) -> Solution:
+    def iter_step(y: Array, t_0: Array, t_1: Array) -> Array:
+        """Stepping function of iterated solution."""
+        t_0, t_1 = np.asarray(t_0), np.asarray(t_1)
+        n = np.ceil((t_1 - t_0) / h).astype(int)
+        dt = (t_1 - t_0) / np.maximum(n, 1)
+        for j in range(int(n.max(initial=0))):
+            y_j = step(y, t_0 + j * dt, t_0 + (j + 1) * dt)
+            y = np.where((j < n)[..., None], y_j, y)
+        return y
+    return iter_step
+# ~\~ end
@@ -0,0 +1,128 @@
+# ~\~ language=Python filename=pintFoam/parareal/checkpoint.py
+# ~\~ begin <<lit/parafutures.md|pintFoam/parareal/checkpoint.py>>[init]
+from __future__ import annotations
+
+import base64
+import json
+import os
+import pickle
+import threading
+from concurrent.futures import CancelledError
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+Key = tuple[str, int, int]
+
+
+@dataclass
+class Checkpoint:
+    """Journal of completed parareal slices, stored in `path`.
+
+    Values are keyed on `(kind, iteration, slice)`, where `kind` is either
+    `"slice"` or `"coarse"`. The `history` maps iterations to the number of
+    frozen slices after that iteration."""
+    path: Path
+    times: Optional[list[float]] = None
+    values: dict[Key, Any] = field(default_factory=dict, repr=False)
+    history: dict[int, int] = field(default_factory=dict)
+    pending: dict[Key, int] = field(default_factory=dict, repr=False, compare=False)
+    lock: threading.Condition = field(default_factory=threading.Condition, repr=False,
+                                      compare=False)
+
+    def __post_init__(self):
+        self.path = Path(self.path)
+        if self.path.exists():
+            self.load()
+
+    def load(self):
+        with open(self.path, "rb") as f:
+            lines = f.read().split(b"\n")
+        size = 0
+        for line in lines[:-1]:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                break
+            self._apply(entry)
+            size += len(line) + 1
+        if size < self.path.stat().st_size:
+            os.truncate(self.path, size)
+
+    def _apply(self, entry: dict):
+        kind = entry["kind"]
+        if kind == "run":
+            self.times = entry["times"]
+        elif kind == "iteration":
+            self.history[entry["k"]] = entry["frozen"]
+        else:
+            value = pickle.loads(base64.b64decode(entry["value"]))
+            self.values[(kind, entry["k"], entry["i"])] = value
+
+    def _append(self, entry: dict):
+        line = json.dumps(entry) + "\n"
+        with self.lock, open(self.path, "a") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def start(self, t):
+        """Start or resume a run on time points `t`."""
+        times = [float(x) for x in t]
+        if self.times is None:
+            self.times = times
+            self._append({"kind": "run", "times": times})
+        elif self.times != times:
+            raise ValueError(f"Checkpoint {self.path} belongs to a run with different times.")
+
+    def __contains__(self, key: Key) -> bool:
+        return key in self.values
+
+    def __getitem__(self, key: Key) -> Any:
+        return self.values[key]
+
+    def get(self, key: Key) -> Any:
+        return self.values.get(key)
+
+    def record(self, key: Key, value: Any):
+        with self.lock:
+            if key in self.values:
+                return
+            self.values[key] = value
+        kind, k, i = key
+        self._append({"kind": kind, "k": k, "i": i,
+                      "value": base64.b64encode(pickle.dumps(value)).decode()})
+
+    def watch(self, key: Key, future):
+        """Record the result of a Dask future once it is computed."""
+        def done(f):
+            try:
+                if f.status == "finished":
+                    self.record(key, f.result())
+            except CancelledError:
+                pass
+            finally:
+                with self.lock:
+                    self.pending[key] -= 1
+                    if not self.pending[key]:
+                        del self.pending[key]
+                    self.lock.notify_all()
+
+        with self.lock:
+            self.pending[key] = self.pending.get(key, 0) + 1
+        future.add_done_callback(done)
+
+    def iteration(self, k: int, frozen: int):
+        """Mark iteration `k` as complete, with `frozen` slices converged. Waits
+        until the completed slices of iterations up to `k` are recorded."""
+        with self.lock:
+            self.lock.wait_for(lambda: all(j > k for _, j, _ in self.pending))
+        if self.history.get(k) != frozen:
+            self.history[k] = frozen
+            self._append({"kind": "iteration", "k": k, "frozen": frozen})
+
+    @property
+    def last_iteration(self) -> Optional[int]:
+        """Last iteration of which all slices were recorded by `run`."""
+        return max(self.history, default=None)
+# ~\~ end
@@ -1,12 +1,15 @@
 # ~\~ language=Python filename=pintFoam/parareal/futures.py
 # ~\~ begin <<lit/parafutures.md|parareal-futures>>[init]
 from .abstract import (Solution, Mapping, Vector)
-from typing import (Callable)
-from dataclasses import dataclass
+from .checkpoint import Checkpoint
+from .operations import (combine, max_norm, distance)
+from ..lifetime import Lifetime, case_path
+from typing import (Callable, Optional)
+from dataclasses import dataclass, field
 from math import ceil
 import numpy as np
 from numpy.typing import NDArray
-from dask.distributed import Client, Future  # type: ignore
+from dask.distributed import Client, Future, as_completed  # type: ignore
 import logging
 
 
@@ -17,10 +20,6 @@ def pairs(lst):
     return zip(lst[:-1], lst[1:])
 # ~\~ end
 # ~\~ begin <<lit/parafutures.md|parareal-futures>>[1]
-def combine(c1: Vector, f1: Vector, c2: Vector) -> Vector:
-    return c1 + f1 - c2
-# ~\~ end
-# ~\~ begin <<lit/parafutures.md|parareal-futures>>[2]
 @dataclass
 class Parareal:
     client: Client
@@ -28,50 +27,155 @@ class Parareal:
     fine: Callable[[int], Solution]
     c2f: Mapping = identity
     f2c: Mapping = identity
+    pack: Mapping = identity
+    tolerance: Optional[float] = None
+    norm: Callable[[Vector], float] = max_norm
+    checkpoint: Optional[Checkpoint] = None
+    lifetime: Optional[Lifetime] = None
+    locality: bool = True
+    coarse_resources: Optional[dict[str, float]] = None
+    fine_resources: Optional[dict[str, float]] = None
+    intermediates: dict[int, list[Future]] = field(default_factory=dict, repr=False,
+                                                   compare=False)
+    placement: list[str] = field(default_factory=list, repr=False, compare=False)
 
-    def _c2f(self, x: Future) -> Future:
+    def _c2f(self, x: Future, i: int) -> Future:
         if self.c2f is identity:
             return x
-        return self.client.submit(self.c2f, x)
+        return self.client.submit(self.c2f, x, **self._options(i))
 
-    def _f2c(self, x: Future) -> Future:
+    def _f2c(self, x: Future, i: int) -> Future:
         if self.f2c is identity:
             return x
-        return self.client.submit(self.f2c, x)
+        return self.client.submit(self.f2c, x, **self._options(i))
+
+    def _pack(self, x: Future, i: int) -> Future:
+        if self.pack is identity:
+            return x
+        return self.client.submit(self.pack, x, **self._options(i))
 
-    def _coarse(self, n_iter: int, y: Future, t0: float, t1: float) ->  Future:
+    def _coarse(self, n_iter: int, y: Future, t0: float, t1: float, i: int) ->  Future:
         logging.debug("Coarse run: %s, %s, %s", y, t0, t1)
-        return self.client.submit(self.coarse(n_iter), y, t0, t1)
+        return self.client.submit(self.coarse(n_iter), y, t0, t1,
+                                  **self._options(i, self.coarse_resources))
 
-    def _fine(self, n_iter: int, y: Future, t0: float, t1: float) -> Future:
+    def _fine(self, n_iter: int, y: Future, t0: float, t1: float, i: int) -> Future:
         logging.debug("Fine run: %s, %s, %s", y, t0, t1)
-        return self.client.submit(self.fine(n_iter), y, t0, t1)
+        return self.client.submit(self.fine(n_iter), y, t0, t1,
+                                  **self._options(i, self.fine_resources))
+
+    def _propagate(self, n_iter: int, y: Future, t0: float, t1: float, i: int) -> Future:
+        x = self._f2c(y, i)
+        c = self._coarse(n_iter, x, t0, t1, i)
+        z = self._c2f(c, i)
+        result = self._pack(z, i)
+        self._track(n_iter, *[f for f in (x, c, z, result) if f is not y])
+        return result
+
+    # ~\~ begin <<lit/parafutures.md|parareal-placement-methods>>[init]
+    def _place(self, t: NDArray[np.float64]):
+        """Assign the slices of `t` to the current workers, in contiguous blocks."""
+        workers = sorted(self.client.nthreads()) if self.locality else []
+        self.placement = [workers[i * len(workers) // t.size] for i in range(t.size)] \
+            if workers else []
+
+    def _options(self, i: int, resources: Optional[dict[str, float]] = None) -> dict:
+        """Keyword arguments to `Client.submit` for a task of slice `i`."""
+        options: dict = {}
+        if i < len(self.placement):
+            options.update(workers=[self.placement[i]], allow_other_workers=True)
+        if resources is not None:
+            options["resources"] = resources
+        return options
+    # ~\~ end
+
+    # ~\~ begin <<lit/parafutures.md|parareal-checkpoint-methods>>[init]
+    def _restorable(self, n_iter: int, i: int) -> bool:
+        return self.checkpoint is not None and ("slice", n_iter, i) in self.checkpoint
+
+    def _restore(self, n_iter: int, i: int) -> tuple[Future, Optional[Future]]:
+        assert self.checkpoint is not None
+        y = self.client.scatter(self.checkpoint[("slice", n_iter, i)], hash=False)
+        c = self.checkpoint.get(("coarse", n_iter, i))
+        return y, (self.client.scatter(c, hash=False) if c is not None else None)
+
+    def _record(self, n_iter: int, i: int, y: Future, c: Optional[Future] = None) -> Future:
+        if self.checkpoint is not None:
+            if c is not None:
+                self.checkpoint.watch(("coarse", n_iter, i), c)
+            self.checkpoint.watch(("slice", n_iter, i), y)
+        return y
+    # ~\~ end
+
+    # ~\~ begin <<lit/parafutures.md|parareal-lifetime-methods>>[init]
+    def _track(self, n_iter: int, *futures: Future):
+        if self.lifetime is not None:
+            self.intermediates.setdefault(n_iter, []).extend(futures)
+
+    def _collect(self, n_iter: int, live: list[Future]):
+        """Delete the cases of finished intermediates of iterations before
+        `n_iter`, except those of the `live` futures."""
+        if self.lifetime is None:
+            return
+        keys = {f.key for f in live}
+        dead = [f for j in sorted(self.intermediates) if j < n_iter
+                for f in self.intermediates.pop(j)
+                if f.key not in keys and f.status == "finished"]
+        keep = live + self.intermediates.get(n_iter, [])
+        dead_paths, live_paths = self.client.gather([
+            [self.client.submit(case_path, f) for f in dead],
+            [self.client.submit(case_path, f) for f in keep]])
+        if self.checkpoint is not None:
+            with self.checkpoint.lock:
+                live_paths.extend(case_path(v) for v in self.checkpoint.values.values())
+        self.lifetime.release(dead_paths, live_paths)
+    # ~\~ end
 
     # ~\~ begin <<lit/parafutures.md|parareal-methods>>[init]
-    def step(self, n_iter: int, y_prev: list[Future], t: NDArray[np.float64]) -> list[Future]:
+    def step(self, n_iter: int, y_prev: list[Future], t: NDArray[np.float64],
+             frozen: int = 0, g: Optional[list[Optional[Future]]] = None) -> list[Future]:
         m = t.size
-        y_next = [None] * m
-        y_next[0] = y_prev[0]
+        y_next = list(y_prev)
 
-        for i in range(1, m):
-            c1 = self._c2f(self._coarse(n_iter, self.f2c(y_next[i-1]), t[i-1], t[i]))
-            f1 = self._fine(n_iter, y_prev[i-1], t[i-1], t[i])
-            c2 = self._c2f(self._coarse(n_iter, self.f2c(y_prev[i-1]), t[i-1], t[i]))
-            y_next[i] = self.client.submit(combine, c1, f1, c2)
+        for i in range(max(1, n_iter, frozen), m):
+            if self._restorable(n_iter, i):
+                y_next[i], c1 = self._restore(n_iter, i)
+            else:
+                c2 = g[i] if g is not None and g[i] is not None \
+                    else self._propagate(n_iter, y_prev[i-1], t[i-1], t[i], i)
+                c1 = c2 if y_next[i-1] is y_prev[i-1] \
+                    else self._propagate(n_iter, y_next[i-1], t[i-1], t[i], i)
+                f1 = self._fine(n_iter, y_prev[i-1], t[i-1], t[i], i)
+                y_next[i] = self._record(
+                    n_iter, i, self.client.submit(combine, c1, f1, c2, **self._options(i)), c1)
+                self._track(n_iter, f1, y_next[i])
+            if g is not None:
+                g[i] = c1
 
         return y_next
     # ~\~ end
     # ~\~ begin <<lit/parafutures.md|parareal-methods>>[1]
+    def initial(self, y_0: Vector, t: NDArray[np.float64]) -> list[Future]:
+        """Schedule the initial coarse integration."""
+        if self.checkpoint is not None:
+            self.checkpoint.start(t)
+        self._place(t)
+        y_init = [self.client.scatter(y_0, hash=False)]
+        for i, (a, b) in enumerate(pairs(t), start=1):
+            if self._restorable(0, i):
+                y_init.append(self._restore(0, i)[0])
+            else:
+                y_init.append(self._record(0, i, self._propagate(0, y_init[-1], a, b, i)))
+        return y_init
+
     def schedule(self, y_0: Vector, t: NDArray[np.float64]) -> list[list[Future]]:
         # schedule initial coarse integration
-        y_init = [self.client.scatter(y_0)]
-        for (a, b) in pairs(t):
-            y_init.append(self._coarse(0, y_init[-1], a, b))
+        jobs = [self.initial(y_0, t)]
+        g = [None] + jobs[0][1:]
 
         # schedule all iterations of parareal
-        jobs = [y_init]
         for n_iter in range(len(t)):
-            jobs.append(self.step(n_iter+1, jobs[-1], t))
+            jobs.append(self.step(n_iter+1, jobs[-1], t, g=g))
 
         return jobs
     # ~\~ end
@@ -80,9 +184,101 @@ class Parareal:
         for i in range(len(jobs)):
             result = self.client.gather(jobs[i])
             if convergence_test(result):
-                for j in jobs[i+1:]:
-                    self.client.cancel(j)
+                self._cancel(jobs[i+1:], keep=jobs[i])
+                return result
+        return result
+
+    def _cancel(self, jobs: list[list[Future]], keep: list[Future]):
+        keys = {f.key for f in keep}
+        self.client.cancel([f for j in jobs for f in j if f.key not in keys])
+    # ~\~ end
+    # ~\~ begin <<lit/parafutures.md|parareal-methods>>[3]
+    def frozen(self, n_iter: int, y_prev: list[Future], y_next: list[Future],
+               frozen: int = 0) -> int:
+        start = max(1, n_iter, frozen)
+        if self.tolerance is None:
+            return start
+        distances = self.client.gather([
+            self.client.submit(distance, self.norm, a, b)
+            for a, b in zip(y_prev[start:], y_next[start:])])
+        for d in distances:
+            if d > self.tolerance:
+                break
+            start += 1
+        return start
+    # ~\~ end
+    # ~\~ begin <<lit/parafutures.md|parareal-methods>>[4]
+    def run(self, y_0: Vector, t: NDArray[np.float64],
+            convergence_test: Optional[Callable[[list[Vector]], bool]] = None,
+            lookahead: int = 1) -> list[Vector]:
+        max_iter = t.size - 1
+        frozen = 1
+        jobs = [self.initial(y_0, t)]
+        g = [None] + jobs[0][1:]
+        for n_iter in range(max_iter + 1):
+            while len(jobs) <= min(n_iter + lookahead, max_iter):
+                jobs.append(self.step(len(jobs), jobs[-1], t, frozen, g))
+            if n_iter > 0:
+                frozen = self.frozen(n_iter, jobs[n_iter-1], jobs[n_iter], frozen)
+            result = self.client.gather(jobs[n_iter])
+            if self.checkpoint is not None:
+                self.checkpoint.iteration(n_iter, frozen)
+            converged = (convergence_test is not None and convergence_test(result)) \
+                or (self.tolerance is not None and frozen == t.size)
+            if converged or n_iter == max_iter:
+                self._collect(max_iter + 1, jobs[n_iter])
+                self._cancel(jobs[n_iter+1:], keep=jobs[n_iter])
                 return result
+            self._collect(n_iter, [f for y in jobs[n_iter:] for f in y]
+                          + [c for c in g if c is not None])
+        return result
+    # ~\~ end
+    # ~\~ begin <<lit/parafutures.md|parareal-methods>>[5]
+    def pipeline(self, y_0: Vector, t: NDArray[np.float64],
+                 lookahead: int = 1) -> list[Vector]:
+        m = t.size
+        max_iter = m - 1
+        frozen = 1
+        frozen_at = [0] * m
+        passed: list[set[int]] = [set() for _ in range(m)]
+        jobs = [self.initial(y_0, t)]
+        g = [None] + jobs[0][1:]
+        pending: dict[Future, tuple[int, int]] = {}
+        events = as_completed()
+
+        while frozen < m:
+            while len(jobs) <= max_iter and \
+                    (not pending or len(jobs) <= frozen_at[frozen-1] + lookahead):
+                k, y_prev = len(jobs), jobs[-1]
+                y_next = self.step(k, y_prev, t, frozen, g)
+                for i in range(1, m):
+                    if y_next[i] is y_prev[i]:
+                        continue
+                    if i <= k:
+                        event = y_next[i]
+                    elif self.tolerance is not None:
+                        event = self.client.submit(distance, self.norm, y_prev[i], y_next[i])
+                    else:
+                        continue
+                    pending[event] = (k, i)
+                    events.add(event)
+                jobs.append(y_next)
+
+            event = next(events)
+            k, i = pending.pop(event)
+            if i <= k or event.result() <= self.tolerance:
+                passed[i].add(k)
+            while frozen < m:
+                valid = [j for j in passed[frozen] if j >= frozen_at[frozen-1]]
+                if not valid:
+                    break
+                frozen_at[frozen] = min(valid)
+                frozen += 1
+
+        futures = [jobs[k][i] for i, k in enumerate(frozen_at)]
+        result = self.client.gather(futures)
+        self._collect(m, futures)
+        events.clear()
         return result
     # ~\~ end
 # ~\~ end
@@ -7,7 +7,8 @@ import numpy as np
 
 def harmonic_oscillator(omega_0: float, zeta: float) -> Problem:
     def f(y, t):
-        return np.r_[y[1], -2 * zeta * omega_0 * y[1] - omega_0**2 * y[0]]
+        q, p = y[..., 0], y[..., 1]
+        return np.stack([p, -2 * zeta * omega_0 * p - omega_0**2 * q], axis=-1)
     return f
 
 # ~\~ begin <<lit/parareal.md|harmonic-oscillator-solution>>[init]
@@ -34,6 +35,8 @@ if __name__ == "__main__":
     from pintFoam.parareal.forward_euler import forward_euler
     from pintFoam.parareal.iterate_solution import iterate_solution
     from pintFoam.parareal.tabulate_solution import tabulate_np
+    from pintFoam.parareal.parareal import parareal_np
+    from pintFoam.parareal import batch
 
     OMEGA0 = 1.0
     ZETA = 0.5
@@ -52,16 +55,25 @@ if __name__ == "__main__":
     exact_result = underdamped_solution(OMEGA0, ZETA)(t)
     euler_result = tabulate_np(fine, y0, t)
 
+    # parareal, with the fine and coarse corrections batched over all slices
+    batch_coarse = batch.forward_euler(system)
+    batch_fine = batch.iterate_solution(batch.forward_euler(system), H)
+    parareal_result = tabulate_np(coarse, y0, t)
+    for _ in range(5):
+        parareal_result = parareal_np(batch_coarse, batch_fine, batched=True)(parareal_result, t)
+
     data = pd.DataFrame({
         "time": t,
         "exact_q": exact_result[:,0],
         "exact_p": exact_result[:,1],
         "euler_q": euler_result[:,0],
-        "euler_p": euler_result[:,1]})
+        "euler_p": euler_result[:,1],
+        "parareal_q": parareal_result[:,0]})
 
     plot = ggplot(data) \
         + geom_line(aes("time", "exact_q")) \
-        + geom_line(aes("time", "euler_q"), color="#000088")
+        + geom_line(aes("time", "euler_q"), color="#000088") \
+        + geom_line(aes("time", "parareal_q"), color="#880000", linetype="dashed")
     plot.save("plot.svg")
 
 # ~\~ end
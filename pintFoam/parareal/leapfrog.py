@@ -0,0 +1,22 @@
+# ~\~ language=Python filename=pintFoam/parareal/leapfrog.py
+# ~\~ begin <<lit/parareal.md|pintFoam/parareal/leapfrog.py>>[init]
+from .abstract import (Problem, Solution)
+from typing import Any
+import numpy as np
+
+Array = Any
+
+def leapfrog(f: Problem) -> Solution:
+    """Leapfrog (Störmer-Verlet) solver. The first half of the last axis of
+    the state holds the positions, the second half the momenta."""
+    def step(y: Array, t_0: float, t_1: float) -> Array:
+        """Stepping function of leapfrog method."""
+        h = t_1 - t_0
+        n = y.shape[-1] // 2
+        y = np.array(y, dtype=float)
+        y[..., n:] += (h / 2) * f(y, t_0)[..., n:]
+        y[..., :n] += h * f(y, t_0 + h / 2)[..., :n]
+        y[..., n:] += (h / 2) * f(y, t_1)[..., n:]
+        return y
+    return step
+# ~\~ end
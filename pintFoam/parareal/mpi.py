@@ -0,0 +1,78 @@
+# ~\~ language=Python filename=pintFoam/parareal/mpi.py
+# ~\~ begin <<lit/parafutures.md|pintFoam/parareal/mpi.py>>[init]
+"""Parareal on MPI, with one rank per time slice."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+import numpy as np
+from numpy.typing import NDArray
+from mpi4py import MPI  # type: ignore
+
+from .abstract import (Solution, Mapping, Vector)
+from .operations import (combine, max_norm, distance)
+from .parareal import identity
+
+
+@dataclass
+class Parareal:
+    coarse: Callable[[int], Solution]
+    fine: Callable[[int], Solution]
+    c2f: Mapping = identity
+    f2c: Mapping = identity
+    tolerance: Optional[float] = None
+    norm: Callable[[Vector], float] = max_norm
+    comm: Any = None
+    iterations: int = 0
+
+    def __post_init__(self):
+        if self.comm is None:
+            self.comm = MPI.COMM_WORLD
+
+    def _propagate(self, n_iter: int, y: Vector, t0: float, t1: float) -> Vector:
+        return self.c2f(self.coarse(n_iter)(self.f2c(y), t0, t1))
+
+    def run(self, y_0: Vector, t: NDArray[np.float64],
+            max_iter: Optional[int] = None) -> list[Vector]:
+        """Run parareal until the solution has converged to within
+        `tolerance`, or for at most `max_iter` iterations. The number of
+        iterations is stored in `iterations`."""
+        comm = self.comm
+        r, size = comm.Get_rank(), comm.Get_size()
+        if size != t.size - 1:
+            raise ValueError(f"Need one rank per time slice, got {t.size - 1} slices "
+                             f"on {size} ranks.")
+        max_iter = size if max_iter is None else min(max_iter, size)
+        t0, t1 = t[r], t[r+1]
+        requests = []
+
+        y_in = y_0 if r == 0 else comm.recv(source=r-1, tag=0)
+        c2 = self._propagate(0, y_in, t0, t1)
+        y_out = c2
+        if r + 1 < size:
+            requests.append(comm.isend(y_out, dest=r+1, tag=0))
+
+        self.iterations = 0
+        for n in range(1, max_iter + 1):
+            d = 0.0
+            if r + 1 >= n:
+                f1 = self.fine(n)(y_in, t0, t1)
+                if r >= n:
+                    y_in = comm.recv(source=r-1, tag=n)
+                    c1 = self._propagate(n, y_in, t0, t1)
+                else:
+                    c1 = c2
+                y_next = combine(c1, f1, c2)
+                if r + 1 < size:
+                    requests.append(comm.isend(y_next, dest=r+1, tag=n))
+                if self.tolerance is not None:
+                    d = distance(self.norm, y_out, y_next)
+                c2, y_out = c1, y_next
+            self.iterations = n
+            if self.tolerance is not None and comm.allreduce(d, op=MPI.MAX) <= self.tolerance:
+                break
+
+        MPI.Request.waitall(requests)
+        return [y_0] + comm.allgather(y_out)
+# ~\~ end
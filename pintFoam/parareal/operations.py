@@ -0,0 +1,28 @@
+# ~\~ language=Python filename=pintFoam/parareal/operations.py
+# ~\~ begin <<lit/parafutures.md|parareal-operations>>[init]
+from typing import Callable
+import numpy as np
+
+from .abstract import Vector
+
+
+def reduce_expr(x):
+    """Evaluate lazy vector expressions; other values are returned as is."""
+    return x.reduce() if hasattr(x, "reduce") else x
+
+
+def combine(c1: Vector, f1: Vector, c2: Vector) -> Vector:
+    return reduce_expr(c1 + f1 - c2)
+# ~\~ end
+# ~\~ begin <<lit/parafutures.md|parareal-operations>>[1]
+
+
+def max_norm(x) -> float:
+    if hasattr(x, "norm"):
+        return x.norm()
+    return float(np.abs(x).max())
+
+
+def distance(norm: Callable[[Vector], float], x: Vector, y: Vector) -> float:
+    return norm(x - y)
+# ~\~ end
@@ -11,15 +11,18 @@ def parareal(
         fine: Solution,
         c2f: Mapping = identity,
         f2c: Mapping = identity):
-    def f(y, t):
+    def f(y, t, g=None):
         m = t.size
         y_n = [None] * m
         y_n[0] = y[0]
         for i in range(1, m):
-            # ~\~ begin <<lit/parareal.md|parareal-core-2>>[init]
-            y_n[i] = c2f(coarse(f2c(y_n[i-1]), t[i-1], t[i])) \
-                   + fine(y[i-1], t[i-1], t[i]) \
-                   - c2f(coarse(f2c(y[i-1]), t[i-1], t[i]))
+            # ~\~ begin <<lit/parareal.md|parareal-core-3>>[init]
+            c1 = c2f(coarse(f2c(y_n[i-1]), t[i-1], t[i]))
+            c2 = g[i] if g is not None and g[i] is not None \
+                else c2f(coarse(f2c(y[i-1]), t[i-1], t[i]))
+            y_n[i] = c1 + fine(y[i-1], t[i-1], t[i]) - c2
+            if g is not None:
+                g[i] = c1
             # ~\~ end
         return y_n
     return f
@@ -28,17 +31,36 @@ def parareal_np(
         coarse: Solution,
         fine: Solution,
         c2f: Mapping = identity,
-        f2c: Mapping = identity):
-    def f(y, t):
+        f2c: Mapping = identity,
+        batched: bool = False):
+    def f(y, t, g=None):
         m = t.size
         y_n = np.zeros_like(y)
         y_n[0] = y[0]
-        for i in range(1, m):
-            # ~\~ begin <<lit/parareal.md|parareal-core-2>>[init]
-            y_n[i] = c2f(coarse(f2c(y_n[i-1]), t[i-1], t[i])) \
-                   + fine(y[i-1], t[i-1], t[i]) \
-                   - c2f(coarse(f2c(y[i-1]), t[i-1], t[i]))
+        if batched:
+            # ~\~ begin <<lit/parareal.md|parareal-batched>>[init]
+            f1 = fine(y[:-1], t[:-1], t[1:])
+            c2 = [None] * (m - 1) if g is None else list(g[1:])
+            missing = np.array([j for j, c in enumerate(c2) if c is None], dtype=int)
+            if missing.size > 0:
+                for j, c in zip(missing, c2f(coarse(f2c(y[missing]), t[missing], t[missing + 1]))):
+                    c2[j] = c
+            for i in range(1, m):
+                c1 = c2f(coarse(f2c(y_n[i-1]), t[i-1], t[i]))
+                y_n[i] = c1 + f1[i-1] - c2[i-1]
+                if g is not None:
+                    g[i] = c1
             # ~\~ end
+        else:
+            for i in range(1, m):
+                # ~\~ begin <<lit/parareal.md|parareal-core-3>>[init]
+                c1 = c2f(coarse(f2c(y_n[i-1]), t[i-1], t[i]))
+                c2 = g[i] if g is not None and g[i] is not None \
+                    else c2f(coarse(f2c(y[i-1]), t[i-1], t[i]))
+                y_n[i] = c1 + fine(y[i-1], t[i-1], t[i]) - c2
+                if g is not None:
+                    g[i] = c1
+                # ~\~ end
         return y_n
     return f
 # ~\~ end
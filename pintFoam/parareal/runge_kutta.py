@@ -0,0 +1,56 @@
+# ~\~ language=Python filename=pintFoam/parareal/runge_kutta.py
+# ~\~ begin <<lit/parareal.md|runge-kutta>>[init]
+from .abstract import (Vector, Problem, Solution)
+from typing import (Any, Optional)
+import numpy as np
+
+Array = Any
+
+def runge_kutta_4(f: Problem) -> Solution:
+    """Classical fourth order Runge-Kutta solver."""
+    def step(y: Vector, t_0: float, t_1: float) -> Vector:
+        """Stepping function of RK4 method."""
+        h = t_1 - t_0
+        k1 = f(y, t_0)
+        k2 = f(y + (h / 2) * k1, t_0 + h / 2)
+        k3 = f(y + (h / 2) * k2, t_0 + h / 2)
+        k4 = f(y + h * k3, t_1)
+        return y + (h / 6) * (k1 + 2 * k2 + 2 * k3 + k4)
+    return step
+# ~\~ end
+# ~\~ begin <<lit/parareal.md|runge-kutta>>[1]
+dormand_prince_tableau = (
+    [1/5],
+    [3/40, 9/40],
+    [44/45, -56/15, 32/9],
+    [19372/6561, -25360/2187, 64448/6561, -212/729],
+    [9017/3168, -355/33, 46732/5247, 49/176, -5103/18656],
+    [35/384, 0, 500/1113, 125/192, -2187/6784, 11/84])
+dormand_prince_nodes = (1/5, 3/10, 4/5, 8/9, 1, 1)
+dormand_prince_error = np.array([
+    71/57600, 0, -71/16695, 71/1920, -17253/339200, 22/525, -1/40])
+
+def dormand_prince(f: Problem, rtol: float = 1e-6, atol: float = 1e-9,
+                   h: Optional[float] = None, max_steps: int = 100000) -> Solution:
+    """Dormand-Prince adaptive solver of order 5(4)."""
+    def solve(y: Array, t_0: float, t_1: float) -> Array:
+        """Integrate from `t_0` to `t_1` with adaptive step size."""
+        t, dt = t_0, h or (t_1 - t_0)
+        k = [f(y, t)]
+        for _ in range(max_steps):
+            if t >= t_1:
+                return y
+            dt = min(dt, t_1 - t)
+            k = k[:1]
+            for a, c in zip(dormand_prince_tableau, dormand_prince_nodes):
+                y_s = y + dt * sum(a_j * k_j for a_j, k_j in zip(a, k) if a_j != 0)
+                k.append(f(y_s, t + c * dt))
+            error = dt * sum(e * k_j for e, k_j in zip(dormand_prince_error, k) if e != 0)
+            scale = atol + rtol * np.maximum(np.abs(y), np.abs(y_s))
+            err = np.sqrt(np.mean((error / scale)**2))
+            if err <= 1.0:
+                t, y, k = t + dt, y_s, k[-1:]
+            dt *= min(5.0, max(0.2, 0.9 * (err or 1e-10)**(-1/5)))
+        raise RuntimeError(f"Dormand-Prince did not reach t = {t_1} in {max_steps} steps.")
+    return solve
+# ~\~ end
@@ -0,0 +1,127 @@
+"""Persistent solver sessions.
+
+Starting an OpenFOAM solver means reading the mesh, building addressing and
+initializing linear solvers. For short coarse runs this startup can take more
+time than the solve itself. A `SolverSession` keeps a single worker process
+alive and sends it jobs over a pipe, so that the startup is paid only once.
+
+The worker is any executable that implements the following line-based
+protocol. For every job it receives a single line of JSON on its standard
+input,
+
+    {"case": "<path>", "startTime": 0.0, "endTime": 1.0, "deltaT": 0.1,
+     "writeInterval": 1.0, "writeControl": "runTime"}
+
+runs the case (the `controlDict` of the case is written beforehand, with
+identical settings), and replies with a single line of JSON on its standard
+output: `{"status": "ok"}` on success, or `{"status": "error", "message":
+"..."}` otherwise. Anything else the worker has to say should go to its
+standard error, which is redirected to `log.session` in the working directory
+of the session. The worker stops when its standard input is closed.
+
+OpenFOAM solvers do not speak this protocol by themselves; this requires a
+solver application that loops over incoming jobs, rereading the time controls
+and fields of the given case between runs.
+"""
+from __future__ import annotations
+
+import json
+import subprocess
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, List, Optional
+
+
+class SessionError(Exception):
+    """The solver worker failed to complete a job."""
+
+
+@dataclass
+class SolverSession:
+    """Long-lived solver worker, started on first use.
+
+    Sessions can be sent to other processes, for instance to Dask workers:
+    the running process is not copied, instead every process starts its own
+    worker when it first submits a job.
+
+    Attributes:
+        command: command line that starts the worker.
+        cwd:     working directory of the worker.
+        solver:  name of the solver that the worker runs, if known.
+        base:    path of the base case that the worker was started for, if known.
+    """
+    command: List[str]
+    cwd: Path
+    solver: Optional[str] = None
+    base: Optional[Path] = None
+    process: Optional[subprocess.Popen] = field(default=None, repr=False, compare=False)
+    log: Optional[IO] = field(default=None, repr=False, compare=False)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def __getstate__(self):
+        return {"command": self.command, "cwd": self.cwd,
+                "solver": self.solver, "base": self.base}
+
+    def __setstate__(self, state):
+        self.__init__(**state)  # type: ignore
+
+    @property
+    def running(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        if self.running:
+            return
+        self.log = open(Path(self.cwd) / "log.session", "a")
+        self.process = subprocess.Popen(
+            self.command, cwd=self.cwd, text=True, bufsize=1,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=self.log)
+
+    def close(self):
+        if self.process is not None:
+            assert self.process.stdin and self.process.stdout
+            self.process.stdin.close()
+            self.process.wait()
+            self.process.stdout.close()
+            self.process = None
+        if self.log is not None:
+            self.log.close()
+            self.log = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def check(self, solver: str, base: Path):
+        """Raise a `ValueError` if this session was started for another
+        solver or base case."""
+        if self.solver is not None and self.solver != solver:
+            raise ValueError(f"Session runs {self.solver}, not {solver}.")
+        if self.base is not None and Path(self.base).resolve() != Path(base).resolve():
+            raise ValueError(f"Session was started for base case {self.base}, not {base}.")
+
+    def run(self, case: Path, t_0: float, t_1: float, dt: float,
+            write_interval: Optional[float] = None,
+            write_control: str = "runTime"):
+        """Run a single job, blocking until the worker reports back."""
+        job = {"case": str(Path(case).resolve()),
+               "startTime": float(t_0), "endTime": float(t_1), "deltaT": float(dt),
+               "writeInterval": float(write_interval or (t_1 - t_0)),
+               "writeControl": write_control}
+        with self.lock:
+            self.start()
+            assert self.process and self.process.stdin and self.process.stdout
+            self.process.stdin.write(json.dumps(job) + "\n")
+            self.process.stdin.flush()
+            reply = self.process.stdout.readline()
+            if not reply:
+                raise SessionError(
+                    f"Solver worker {self.command} exited with code {self.process.wait()}.")
+
+        status = json.loads(reply)
+        if status.get("status") != "ok":
+            raise SessionError(status.get("message", f"Job failed: {job}"))
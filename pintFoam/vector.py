@@ -4,22 +4,45 @@ from __future__ import annotations
 
 import operator
 import mmap
+import os
 import weakref
 import gc
 
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from dataclasses import dataclass
+from functools import partial
 from pathlib import Path
 from uuid import uuid4
-from shutil import copytree, rmtree   # , copy
-from typing import List, Optional
+from shutil import copy2, copytree, rmtree
+from typing import Any, Callable, Dict, List, Optional
 
-from byteparsing import parse_bytes, foam_file
+import numpy as np
 
-from PyFoam.RunDictionary.ParsedParameterFile import ParsedParameterFile  # type: ignore
-from PyFoam.RunDictionary.SolutionDirectory import SolutionDirectory      # type: ignore
+from . import cache
+from .binary import (locate_internal_field, binary_data, has_layout,
+                     ascii_to_binary, set_write_format)
+from .control_dict import Template, load_template
 
 # ~\~ begin <<lit/cylinder.md|base-case>>[init]
+def link_or_copy(source, target):
+    """Hard link a file, falling back to a copy across file systems."""
+    try:
+        os.link(source, target)
+    except OSError:
+        copy2(source, target)
+
+
+def share(source: Path, target: Path):
+    """Share a read-only directory between cases. We use a relative symbolic
+    link where possible, and a hard-linked copy otherwise."""
+    try:
+        target.symlink_to(os.path.relpath(source, target.parent), target_is_directory=True)
+    except OSError:
+        copytree(source, target, copy_function=link_or_copy)
+
+
 @dataclass
 class BaseCase:
     """Base case is a cleaned version of the system. If it contains any fields,
@@ -33,14 +56,40 @@ class BaseCase:
     def path(self):
         return self.root / self.case
 
-    def new_vector(self, name: Optional[str] = None):
-        """Creates new `Vector` using this base case."""
+    def new_case(self, name: Optional[str] = None) -> str:
+        """Creates a new case without any time directories. The mesh and
+        other data in `constant` are shared with the base case, only `system`
+        is copied so that every case has its own `controlDict`."""
         new_case = name or uuid4().hex
         new_path = self.root / new_case
         if not new_path.exists():
-            copytree(self.path, new_path)
+            new_path.mkdir()
+            share(self.path / "constant", new_path / "constant")
+            copytree(self.path / "system", new_path / "system")
+        return new_case
+
+    def new_vector(self, name: Optional[str] = None):
+        """Creates new `Vector` using this base case."""
+        new_case = self.new_case(name)
+        new_path = self.root / new_case
+        if not (new_path / "0").exists():
+            copytree(self.path / "0", new_path / "0")
         return Vector(self, new_case, "0")
 
+    def set_write_format(self, fmt: str = "binary"):
+        """Set `writeFormat` in the `controlDict` of this base case. When
+        switching to binary, the fields in `0` are converted as well."""
+        set_write_format(self.path / "system" / "controlDict", fmt)
+        if fmt == "binary":
+            for f in (self.path / "0").iterdir():
+                if f.is_file():
+                    ascii_to_binary(f)
+
+    def control_dict_template(self) -> Template:
+        """Template of the `controlDict` of this base case, in which the time
+        controls can be filled in."""
+        return load_template(self.path / "system" / "controlDict")
+
     def all_vector_paths(self):
         """Iterates all sub-directories in the root."""
         return (x for x in self.root.iterdir()
@@ -50,18 +99,152 @@ class BaseCase:
         """Deletes all vectors of this base-case."""
         for path in self.all_vector_paths():
             rmtree(path)
+            cache.field_cache.forget(path)
+# ~\~ end
+# ~\~ begin <<lit/cylinder.md|pintfoam-vector-expressions>>[init]
+class VectorExpr(ABC):
+    """Lazy arithmetic on `Vector` snapshots. Operators only build an
+    expression tree; `reduce` evaluates the tree in a single pass per field,
+    writing the result to a single new case."""
+    @abstractmethod
+    def leaves(self) -> List[Vector]:
+        """All `Vector` snapshots that this expression reads from."""
+        ...
+
+    @abstractmethod
+    def evaluate(self, data: Dict[Path, Any]) -> Any:
+        """Compute the expression for a single field, given the data of each
+        leaf, keyed on the leaf's `dirname`."""
+        ...
+
+    @property
+    def fields(self):
+        return self.leaves()[0].fields
+
+    def reduce(self, name: Optional[str] = None, workers: Optional[int] = None) -> Vector:
+        """Materialize this expression as a new `Vector`. Fields are
+        evaluated concurrently on `workers` threads, see `field_map`."""
+        leaves = self.leaves()
+        x = leaves[0].clone(name)
+
+        def reduce_field(f):
+            data = {v.dirname: v.read_data(f) for v in leaves}
+            with x.mmap_data(f) as a:
+                a()[:] = self.evaluate(data)
+
+        # largest fields first, so that the small ones fill up the gaps
+        fields = sorted(self.fields, key=lambda f: (x.dirname / f).stat().st_size,
+                        reverse=True)
+        field_map(reduce_field, fields, workers)
+        return x
+
+    def norm(self, workers: Optional[int] = None) -> float:
+        """Maximum absolute value over all fields, computed in memory."""
+        leaves = self.leaves()
+
+        def field_norm(f):
+            data = {v.dirname: v.read_data(f) for v in leaves}
+            return float(np.abs(self.evaluate(data)).max(initial=0.0))
+
+        return max(field_map(field_norm, self.fields, workers), default=0.0)
+
+    def materialize(self, name: Optional[str] = None) -> Vector:
+        """This expression as an OpenFOAM case, as needed for input to a
+        solver. For most expressions this is the same as `reduce`, but vectors
+        that are kept in memory are only written to disk here."""
+        return self.reduce(name)
+
+    def __add__(self, other: VectorExpr) -> VectorExpr:
+        return BinaryExpr(operator.add, self, other)
+
+    def __sub__(self, other: VectorExpr) -> VectorExpr:
+        return BinaryExpr(operator.sub, self, other)
+
+    def __mul__(self, scale: float) -> VectorExpr:
+        return UnaryExpr(partial(operator.mul, scale), self)
+
+    def __rmul__(self, scale: float) -> VectorExpr:
+        return UnaryExpr(partial(operator.mul, scale), self)
+# ~\~ end
+# ~\~ begin <<lit/cylinder.md|pintfoam-vector-expressions>>[1]
+@dataclass
+class UnaryExpr(VectorExpr):
+    func: Callable[[Any], Any]
+    inp: VectorExpr
+
+    def leaves(self):
+        return self.inp.leaves()
+
+    def evaluate(self, data):
+        return self.func(self.inp.evaluate(data))
+
+
+@dataclass
+class BinaryExpr(VectorExpr):
+    func: Callable[[Any, Any], Any]
+    inp1: VectorExpr
+    inp2: VectorExpr
+
+    def leaves(self):
+        return self.inp1.leaves() + self.inp2.leaves()
+
+    def evaluate(self, data):
+        return self.func(self.inp1.evaluate(data), self.inp2.evaluate(data))
 # ~\~ end
 # ~\~ begin <<lit/cylinder.md|pintfoam-vector>>[init]
 def solution_directory(case):
+    from PyFoam.RunDictionary.SolutionDirectory import SolutionDirectory  # type: ignore
     return SolutionDirectory(case.path)
 
 def parameter_file(case, relative_path):
+    from PyFoam.RunDictionary.ParsedParameterFile import ParsedParameterFile  # type: ignore
     return ParsedParameterFile(case.path / relative_path)
 
 def time_directory(case):
     return solution_directory(case)[case.time]
 
 
+def close_map(mm: mmap.mmap):
+    """Close a memory map. Views on the map are released as soon as they go
+    out of scope, unless a reference cycle keeps them alive; only then do we
+    need a garbage collection. If the map is still referenced after that, for
+    instance from a traceback, it is closed when the last view is released."""
+    try:
+        mm.close()
+    except BufferError:
+        gc.collect()
+        try:
+            mm.close()
+        except BufferError:
+            pass
+
+
+def read_field(path: Path) -> cache.FieldData:
+    """Read the `internalField` of a field file into a `FieldData`. Binary
+    data is located directly, other files are parsed in full."""
+    result = None
+    with path.open(mode="rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            layout = locate_internal_field(mm)
+            if layout is not None:
+                return cache.FieldData(binary_data(mm, layout).copy(), layout[0])
+            from byteparsing import parse_bytes, foam_file
+            content = parse_bytes(foam_file, mm)
+            value = content["data"]["internalField"]
+            if isinstance(value, np.ndarray):
+                result = cache.FieldData(value.copy())
+            elif isinstance(value, dict) and "data" in value:
+                result = cache.FieldData(np.array(value["data"], dtype=float))
+            del value
+            del content
+        finally:
+            close_map(mm)
+    if result is None:
+        raise ValueError(f"No non-uniform internalField found in {path}.")
+    return result
+
+
 def get_times(path):
     """Get all the snapshots in a case, sorted on floating point value."""
     def isfloat(s: str) -> bool:
@@ -76,8 +259,33 @@ def get_times(path):
         key=float)
 # ~\~ end
 # ~\~ begin <<lit/cylinder.md|pintfoam-vector>>[1]
+FIELD_WORKERS_ENV = "PINTFOAM_FIELD_WORKERS"
+
+
+def field_workers() -> int:
+    """Default number of threads for field-wise operations."""
+    n = os.environ.get(FIELD_WORKERS_ENV)
+    if n:
+        return max(1, int(n))
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def field_map(func: Callable[[str], Any], fields: List[str],
+              workers: Optional[int] = None) -> List[Any]:
+    """Apply `func` to every field name in `fields`, on a pool of `workers`
+    threads. Results are returned in the order of `fields`."""
+    fields = list(fields)
+    workers = min(workers or field_workers(), len(fields))
+    if workers <= 1:
+        return [func(f) for f in fields]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(func, fields))
+# ~\~ end
+# ~\~ begin <<lit/cylinder.md|pintfoam-vector>>[2]
 @dataclass
-class Vector:
+class Vector(VectorExpr):
     base: BaseCase
     case: str
     time: str
@@ -108,54 +316,71 @@ class Vector:
     def mmap_data(self, field):
         """Context manager that yields a **mutable** reference to the data contained
         in this snapshot. Mutations done to this array are mmapped to the disk directly."""
-        f = (self.dirname / field).open(mode="r+b")
-        with mmap.mmap(f.fileno(), 0) as mm:
-            content = parse_bytes(foam_file, mm)
-            try:
-                result = content["data"]["internalField"]
-            except KeyError as e:
-                print(content)
-                raise e
-            yield weakref.ref(result)
-            del result
-            del content
-            gc.collect()
+        layout = cache.field_cache.layout(self.path, self.time, field)
+        try:
+            with (self.dirname / field).open(mode="r+b") as f:
+                mm = mmap.mmap(f.fileno(), 0)
+                try:
+                    if layout is None or not has_layout(mm, layout):
+                        layout = locate_internal_field(mm)
+                    content = None
+                    if layout is not None:
+                        result = binary_data(mm, layout)
+                    else:
+                        from byteparsing import parse_bytes, foam_file
+                        content = parse_bytes(foam_file, mm)
+                        try:
+                            result = content["data"]["internalField"]
+                        except KeyError as e:
+                            print(content)
+                            raise e
+                        if not isinstance(result, np.ndarray):
+                            raise ValueError(
+                                f"Field {field} of {self.dirname} is not stored in binary format, "
+                                "and cannot be modified in place; see `BaseCase.set_write_format`.")
+                    yield weakref.ref(result)
+                    del result
+                    del content
+                finally:
+                    close_map(mm)
+        finally:
+            # also when the body raises, since it may have written part of the field
+            cache.field_cache.invalidate(self.path, self.time, field)
+
+    def read_data(self, field) -> np.ndarray:
+        """Read-only copy of the data contained in this snapshot. Parsed data is
+        kept in `pintFoam.cache.field_cache`, so that repeated reads are cheap."""
+        key = cache.field_cache.key(self.path, self.time, field)
+        return cache.field_cache.get(key, lambda: read_field(self.dirname / field)).data
     # ~\~ end
     # ~\~ begin <<lit/cylinder.md|pintfoam-vector-clone>>[init]
     def clone(self, name: Optional[str] = None) -> Vector:
         """Clone this vector to a new one. The clone only contains this single snapshot."""
-        x = self.base.new_vector(name)
-        x.time = self.time
+        x = Vector(self.base, self.base.new_case(name), self.time)
         rmtree(x.dirname, ignore_errors=True)
         copytree(self.dirname, x.dirname)
+        cache.field_cache.copy_layouts(self.path, x.path, self.time)
         return x
     # ~\~ end
     # ~\~ begin <<lit/cylinder.md|pintfoam-vector-operate>>[init]
-    def zip_with(self, other: Vector, op) -> Vector:
-        x = self.clone()
-
-        for f in self.fields:
-            with x.mmap_data(f) as a, other.mmap_data(f) as b:
-                a()[:] = op(a(), b())
-        return x
-
-    def map(self, f) -> Vector:
-        x = self.clone()
+    def zip_with(self, other: Vector, op, workers: Optional[int] = None) -> Vector:
+        return BinaryExpr(op, self, other).reduce(workers=workers)
 
-        for f in self.fields:
-            with x.mmap_data(f) as a:
-                a()[:] = f(a())
-        return x
+    def map(self, f, workers: Optional[int] = None) -> Vector:
+        return UnaryExpr(f, self).reduce(workers=workers)
     # ~\~ end
     # ~\~ begin <<lit/cylinder.md|pintfoam-vector-operators>>[init]
-    def __sub__(self, other: Vector) -> Vector:
-        return self.zip_with(other, operator.sub)
+    def leaves(self):
+        return [self]
+
+    def evaluate(self, data):
+        return data[self.dirname]
 
-    def __add__(self, other: Vector) -> Vector:
-        return self.zip_with(other, operator.add)
+    def reduce(self, name: Optional[str] = None, workers: Optional[int] = None) -> Vector:
+        return self
 
-    def __mul__(self, scale: float) -> Vector:
-        return self.map(lambda x: x * scale)
+    def materialize(self, name: Optional[str] = None) -> Vector:
+        return self
     # ~\~ end
 # ~\~ end
 # ~\~ end
@@ -1,7 +1,64 @@
-import pytest
+from functools import partial
+from math import exp
 import os
+import pytest
+
+
+requires_openfoam = {"test_foam_run.py", "test_map_fields.py"}
+
+
+def pytest_collection_modifyitems(config, items):
+    if "FOAM_API" in os.environ and os.environ["FOAM_API"] != "":
+        return
+    skip = pytest.mark.skip(reason="OpenFOAM needed to run this test.")
+    for item in items:
+        if item.nodeid.split("::")[0].split("/")[-1] in requires_openfoam:
+            item.add_marker(skip)
+
+
+def scale(factor, x):
+    return x * factor
+
+
+def decay(x, t_0, t_1):
+    return x.reduce().materialize().map(partial(scale, exp(t_0 - t_1)))
+
+
+def euler(x, t_0, t_1):
+    return x.reduce().materialize().map(partial(scale, 1 - (t_1 - t_0)))
+
+
+def files(x):
+    return {str(p.relative_to(x.dirname)): p.read_bytes()
+            for p in x.dirname.rglob("*") if p.is_file()}
+
+
+@pytest.fixture
+def client():
+    """Dask client with two single threaded workers."""
+    from dask.distributed import Client  # type: ignore
+    with Client(n_workers=2, threads_per_worker=1) as client:
+        yield client
+
+
+@pytest.fixture
+def coarse():
+    """Forward Euler step of dy/dt = -y on every field of a snapshot."""
+    return euler
+
+
+@pytest.fixture
+def fine():
+    """Exact solution of dy/dt = -y on every field of a snapshot."""
+    return decay
+
+
+@pytest.fixture
+def fields():
+    return [("p", "scalar"), ("U", "vector"), ("R", "symmTensor")]
 
 
-def pytest_configure(config):
-    if "FOAM_API" not in os.environ or os.environ["FOAM_API"] == "":
-        pytest.exit("OpenFOAM needed to run tests.")
+@pytest.fixture
+def snapshot():
+    """Contents of all files in the time directory of a snapshot."""
+    return files
@@ -0,0 +1,49 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from pintFoam.archive import H5Vector, load, store, store_trajectory
+from pintFoam.benchmarks.vector_io import synthetic_case
+
+
+def test_store(tmp_path, fields, snapshot):
+    base_case = synthetic_case(tmp_path, 1000, fields)
+    archive = tmp_path / "archive.h5"
+    x = base_case.new_vector()
+    y = store(x, archive, "x", chunk_bytes=4096, compression="gzip")
+    assert isinstance(y, H5Vector) and y.time == x.time
+    for f, _ in fields:
+        assert np.array_equal(y.read_data(f), x.read_data(f))
+    assert np.array_equal(y.read_data("U", np.s_[10:20, 1]), x.read_data("U")[10:20, 1])
+    assert snapshot(y.unpack()) == snapshot(x)
+
+    z = (2 * y - x).reduce()
+    assert np.allclose(z.read_data("p"), x.read_data("p"))
+    assert store(y - x, archive, "x").norm() == 0.0
+
+
+def test_trajectory(tmp_path, fields):
+    base_case = synthetic_case(tmp_path, 100, fields)
+    archive = tmp_path / "archive.h5"
+    x = base_case.new_vector()
+    xs = [x.map(lambda a, i=i: i * a) for i in range(3)]
+    ys = store_trajectory(xs, archive, "run", remove=True)
+    assert not any(x_i.path.exists() for x_i in xs)
+    assert [y.name for y in load(archive, base_case, "run")] == ["run/0", "run/1", "run/2"]
+    assert np.isclose((ys[2] - ys[1] - ys[1]).norm(), 0.0)
+
+
+def store_scaled(base_case, archive, i):
+    x = base_case.new_vector()
+    return store(x.map(lambda a: i * a), archive, f"s/{i}", remove=True).name
+
+
+def test_concurrent_writes(tmp_path, fields):
+    base_case = synthetic_case(tmp_path, 1000, fields)
+    archive = tmp_path / "archive.h5"
+    with ProcessPoolExecutor(4) as pool:
+        names = list(pool.map(store_scaled, [base_case] * 8, [archive] * 8, range(8)))
+    ys = {y.name: y for y in load(archive, base_case)}
+    assert sorted(ys) == sorted(names)
+    p = base_case.new_vector().read_data("p")
+    for i in range(8):
+        assert np.allclose(ys[f"s/{i}"].read_data("p"), i * p)
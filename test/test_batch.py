@@ -0,0 +1,57 @@
+import numpy as np
+
+from pintFoam.parareal import batch
+from pintFoam.parareal.forward_euler import forward_euler
+from pintFoam.parareal.harmonic_oscillator import harmonic_oscillator
+from pintFoam.parareal.iterate_solution import iterate_solution
+from pintFoam.parareal.parareal import parareal_np
+from pintFoam.parareal.tabulate_solution import tabulate_np
+
+
+system = harmonic_oscillator(1.0, 0.5)
+H = 0.01
+
+
+def test_batched_propagator():
+    fine = iterate_solution(forward_euler(system), H)
+    batch_fine = batch.iterate_solution(batch.forward_euler(system), H)
+    t = np.array([0.0, 0.3, 1.0, 1.05, 2.5])
+    y = np.random.default_rng(0).normal(size=(t.size - 1, 2))
+
+    expected = np.array([fine(y[j], t[j], t[j+1]) for j in range(t.size - 1)])
+    assert np.allclose(batch_fine(y, t[:-1], t[1:]), expected)
+    assert np.allclose(batch_fine(y[0], t[0], t[1]), expected[0])
+
+
+def test_batched_parareal():
+    coarse, fine = forward_euler(system), iterate_solution(forward_euler(system), H)
+    batch_coarse = batch.forward_euler(system)
+    batch_fine = batch.iterate_solution(batch.forward_euler(system), H)
+    t = np.linspace(0.0, 15.0, 30)
+    y = tabulate_np(coarse, np.array([1.0, 0.0]), t)
+    g = y.copy()
+
+    for _ in range(3):
+        y_ref = parareal_np(coarse, fine)(y, t)
+        y_batched = parareal_np(batch_coarse, batch_fine, batched=True)(y, t, g)
+        assert np.allclose(y_batched, y_ref)
+        y = y_ref
+
+
+def test_batched_buffer():
+    coarse, fine = forward_euler(system), iterate_solution(forward_euler(system), H)
+    batch_coarse = batch.forward_euler(system)
+    batch_fine = batch.iterate_solution(batch.forward_euler(system), H)
+    t = np.linspace(0.0, 15.0, 30)
+    y = tabulate_np(coarse, np.array([1.0, 0.0]), t)
+
+    g_ref = [None] * t.size
+    g = [None] * t.size
+    g[5] = y[5]
+    g_ref[5] = y[5]
+    for _ in range(2):
+        y_ref = parareal_np(coarse, fine)(y, t, g_ref)
+        y_batched = parareal_np(batch_coarse, batch_fine, batched=True)(y, t, g)
+        assert np.allclose(y_batched, y_ref)
+        assert np.allclose(np.array(g[1:]), np.array(g_ref[1:]))
+        y = y_ref
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from pintFoam.benchmarks import profile_options, write_records
+from pintFoam.benchmarks.parareal import benchmark
+from pintFoam.benchmarks import vector_io
+
+
+def test_parareal_benchmark(tmp_path):
+    records = [benchmark(engine, slices=8) for engine in ["sequential", "numpy"]]
+    for r in records:
+        assert 1 <= r["iterations"] <= 8
+        assert r["error"] < 1e-3
+        assert r["wall_time"] > 0 and r["theoretical_speedup"] > 0
+
+    output = tmp_path / "results.jsonl"
+    write_records(records, output)
+    write_records(records[:1], output)
+    lines = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [r["engine"] for r in lines] == ["sequential", "numpy", "sequential"]
+    assert all("commit" in r and "date" in r for r in lines)
+
+
+def test_futures_benchmark():
+    from dask.distributed import Client  # type: ignore
+    with Client(n_workers=2, threads_per_worker=1) as client:
+        r = benchmark("futures", slices=4, workers=2, client=client)
+    assert 1 <= r["iterations"] <= 4
+    assert r["error"] < 1e-3
+    assert r["n_tasks"] > 0
+    assert 0 < r["utilization"] <= 1
+    assert 0 <= r["overhead_per_task"] < r["wall_time"]
+
+
+def test_vector_io_benchmark(tmp_path, monkeypatch):
+    monkeypatch.setenv("PINTFOAM_PROFILE", "cprofile, tracemalloc")
+    monkeypatch.setenv("PINTFOAM_PROFILE_DIR", str(tmp_path))
+    records = vector_io.benchmark(tmp_path / "case", 100, "p,U:vector", "binary", repeat=2)
+    assert [r["run"] for r in records] == [0, 1]
+    for r in records:
+        for stage in ["new_vector", "clone", "parse", "write_back", "zip_with", "reduce"]:
+            assert r[f"{stage}_time"] >= 0
+        assert r["memory_peak"] > 0
+        assert (tmp_path / r["profile"]).exists()
+    assert not (tmp_path / "case" / "baseCase").exists()
+
+
+def test_profile_options(monkeypatch):
+    monkeypatch.delenv("PINTFOAM_PROFILE", raising=False)
+    assert profile_options() == set()
+    monkeypatch.setenv("PINTFOAM_PROFILE", "cProfile")
+    assert profile_options() == {"cprofile"}
+    monkeypatch.setenv("PINTFOAM_PROFILE", "perf")
+    with pytest.raises(ValueError):
+        profile_options()
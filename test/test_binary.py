@@ -0,0 +1,178 @@
+import os
+import sys
+from pathlib import Path
+import numpy as np
+import pytest
+
+from pintFoam.foam import map_fields
+from pintFoam.binary import (ascii_to_binary, file_format, locate_internal_field,
+                             set_write_format)
+from pintFoam.benchmarks.vector_io import synthetic_case
+
+header = """FoamFile
+{{
+    version     2.0;
+    format      ascii;
+    class       {cls};
+    location    "0";
+    object      {name};
+}}
+
+dimensions      [0 1 -1 0 0 0 0];
+
+internalField   nonuniform List<{dtype}>
+{size}
+(
+{values}
+)
+;
+
+boundaryField
+{{
+    inlet
+    {{
+        type            fixedValue;
+        value           nonuniform List<scalar> 3(1 2 3);
+    }}
+    outlet
+    {{
+        type            zeroGradient;
+    }}
+}}
+"""
+
+fields = [("p", "scalar"), ("U", "vector")]
+
+
+def write_ascii_field(path: Path, name: str, data):
+    if data.ndim == 1:
+        cls, dtype = "volScalarField", "scalar"
+        values = "\n".join(f"{x:.17g}" for x in data)
+    else:
+        cls, dtype = "volVectorField", "vector"
+        values = "\n".join("(" + " ".join(f"{x:.17g}" for x in row) + ")" for row in data)
+    path.write_text(header.format(cls=cls, name=name, dtype=dtype, size=len(data), values=values))
+
+
+def test_write_format(tmp_path):
+    case = synthetic_case(tmp_path, 100, fields, fmt="ascii")
+    expected = case.new_vector().read_data("U")
+    case.set_write_format("binary")
+    assert "writeFormat     binary;" in (case.path / "system" / "controlDict").read_text()
+
+    raw = (case.path / "0" / "U").read_bytes()
+    assert file_format(raw) == "binary"
+    offset, dtype, shape = locate_internal_field(raw)
+    assert shape == (100, 3)
+    data = np.frombuffer(raw, dtype=dtype, count=300, offset=offset).reshape(shape)
+    assert np.array_equal(data, expected)
+
+    set_write_format(case.path / "system" / "controlDict", "ascii")
+    assert "writeFormat     ascii;" in (case.path / "system" / "controlDict").read_text()
+
+
+def test_header_entries(tmp_path):
+    path = tmp_path / "p"
+    values = np.linspace(0.0, 1.0, 10)
+    write_ascii_field(path, "p", values)
+    text = path.read_text().replace("    format      ascii;",
+                                    '    note        "ascii export";\n    format      ascii;')
+    path.write_text(text)
+    ascii_to_binary(path)
+    raw = path.read_bytes()
+    assert file_format(raw) == "binary"
+    assert b'note        "ascii export";' in raw
+    offset, dtype, shape = locate_internal_field(raw)
+    assert np.array_equal(np.frombuffer(raw, dtype=dtype, count=10, offset=offset), values)
+
+
+def test_arch(tmp_path):
+    case = synthetic_case(tmp_path, 100, fields, fmt="ascii")
+    x = case.new_vector()
+    for f in case.fields:
+        path = case.path / "0" / f
+        path.write_text(path.read_text().replace(
+            "    format      ascii;",
+            '    format      ascii;\n    arch        "MSB;label=32;scalar=32";'))
+    case.set_write_format("binary")
+    raw = (case.path / "0" / "U").read_bytes()
+    offset, dtype, shape = locate_internal_field(raw)
+    assert dtype == np.dtype(">f4") and shape == (100, 3)
+    assert np.allclose(np.frombuffer(raw, dtype=dtype, count=300, offset=offset),
+                       x.read_data("U").ravel(), rtol=1e-6, atol=0)
+
+    a = case.new_vector()
+    b = (2 * a).reduce()
+    assert np.allclose(b.read_data("p"), 2 * x.read_data("p"), rtol=1e-6, atol=0)
+    assert locate_internal_field((b.dirname / "p").read_bytes())[1] == np.dtype(">f4")
+
+    path = case.path / "0" / "p"
+    path.write_bytes(path.read_bytes().replace(b"scalar=32", b"scalar=128"))
+    with pytest.raises(ValueError):
+        locate_internal_field(path.read_bytes())
+
+
+def test_binary_arithmetic(tmp_path):
+    case = synthetic_case(tmp_path, 100, fields)
+    a = case.new_vector()
+    b = a.map(lambda x: 2 * x)
+
+    with b.mmap_data("p") as p:
+        assert np.allclose(p(), 2 * a.read_data("p"))
+
+    c = (a + b - 0.5 * b).reduce()
+    for f in case.fields:
+        assert np.allclose(c.read_data(f), 2 * a.read_data(f))
+    assert np.isclose((b - a).norm(), max(np.abs(a.read_data(f)).max() for f in case.fields))
+    assert len(list(case.all_vector_paths())) == 3
+
+
+def test_ascii_fields(tmp_path):
+    case = synthetic_case(tmp_path, 100, fields, fmt="ascii")
+    a = case.new_vector()
+    assert file_format((a.dirname / "p").read_bytes()) == "ascii"
+    case.set_write_format("binary")
+    b = case.new_vector()
+    for f in case.fields:
+        assert np.array_equal(a.read_data(f), b.read_data(f))
+    assert a.read_data("U").shape == (100, 3)
+    with pytest.raises(ValueError):
+        with a.mmap_data("U"):
+            pass
+
+
+def test_parallel_arithmetic(tmp_path):
+    case = synthetic_case(tmp_path, 1000, [("p", "scalar"), ("U", "vector"), ("R", "symmTensor"),
+                                        ("k", "scalar"), ("UMean", "vector")])
+    a = case.new_vector()
+    b = a.map(lambda x: x * x, workers=1)
+    serial = (a - 0.5 * b).reduce(workers=1)
+    parallel = (a - 0.5 * b).reduce(workers=4)
+    for f in case.fields:
+        assert np.array_equal(serial.read_data(f), parallel.read_data(f))
+        assert np.allclose(parallel.read_data(f), a.read_data(f) - 0.5 * a.read_data(f)**2)
+    assert (serial - a).norm(workers=1) == (parallel - a).norm(workers=4) > 0
+
+
+fake_map_fields = """#!{python}
+import sys
+from shutil import copytree
+source_time, source = sys.argv[-2:]
+copytree(f"{{source}}/{{source_time}}", "0", dirs_exist_ok=True)
+"""
+
+
+def test_map_fields_expression(tmp_path, monkeypatch):
+    (tmp_path / "bin").mkdir()
+    script = tmp_path / "bin" / "mapFields"
+    script.write_text(fake_map_fields.format(python=sys.executable))
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path / 'bin'}{os.pathsep}{os.environ['PATH']}")
+
+    source = synthetic_case(tmp_path / "source", 100, fields)
+    target = synthetic_case(tmp_path / "target", 100, fields, fmt="ascii")
+    a = source.new_vector()
+    cases = set(source.all_vector_paths())
+    b = map_fields(2 * a, target)
+    assert np.allclose(b.read_data("p"), 2 * a.read_data("p"))
+    assert set(source.all_vector_paths()) == cases
@@ -0,0 +1,80 @@
+import os
+from pathlib import Path
+from shutil import rmtree
+import numpy as np
+
+from pintFoam.benchmarks.vector_io import synthetic_case
+from pintFoam.cache import (FieldCache, FieldData, field_cache)
+
+
+def test_lru_eviction():
+    cache = FieldCache(max_bytes=3 * 800)
+    keys = [("case", "0", f"f{i}", 0) for i in range(4)]
+    for k in keys[:3]:
+        cache.get(k, lambda: FieldData(np.zeros(100)))
+    assert len(cache) == 3
+    assert cache.misses == 3
+
+    # touch the oldest entry, so that the second one is evicted next
+    assert cache.lookup(keys[0]) is not None
+    cache.get(keys[3], lambda: FieldData(np.zeros(100)))
+    assert cache.lookup(keys[1]) is None
+    assert cache.lookup(keys[0]) is not None
+    assert cache.nbytes == 3 * 800
+    assert cache.hits == 2
+
+
+def test_layouts(tmp_path):
+    cache = FieldCache()
+    (tmp_path / "0").mkdir()
+    (tmp_path / "0" / "p").write_bytes(b"")
+    key = FieldCache.key(tmp_path, "0", "p")
+    data = cache.get(key, lambda: FieldData(np.arange(10.0), offset=42))
+    assert not data.data.flags.writeable
+    assert cache.layout(tmp_path, "0", "p") == (42, np.dtype(float), (10,))
+
+    cache.copy_layouts(tmp_path, Path("other"), "0")
+    assert cache.layout(Path("other"), "0", "p") == (42, np.dtype(float), (10,))
+
+    cache.invalidate(tmp_path, "0", "p")
+    assert len(cache) == 0
+    assert cache.layout(tmp_path, "0", "p") is None
+
+    cache.forget(Path("other"))
+    assert cache.layout(Path("other"), "0", "p") is None
+
+
+def test_layouts_bounded(tmp_path):
+    base_case = synthetic_case(tmp_path, 100, [("p", "scalar"), ("U", "vector")])
+    x = base_case.new_vector()
+    x.read_data("p")
+    field_cache.max_layouts = 10
+    try:
+        for _ in range(50):
+            rmtree(x.clone().path)
+        assert len(field_cache._layouts) == 10
+        assert field_cache.layout(x.path, "0", "p") is not None
+        base_case.clean()
+        assert field_cache.layout(x.path, "0", "p") is None
+    finally:
+        field_cache.max_layouts = FieldCache.max_layouts
+        field_cache.clear()
+
+
+def test_invalidate_on_error(tmp_path):
+    base_case = synthetic_case(tmp_path, 100, [("p", "scalar")])
+    x = base_case.new_vector()
+    path = x.dirname / "p"
+    before = x.read_data("p").copy()
+    stat = path.stat()
+    try:
+        with x.mmap_data("p") as a:
+            a()[:10] = -1.0
+            # a write through the map need not change the modification time
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    after = x.read_data("p")
+    assert np.all(after[:10] == -1.0)
+    assert np.array_equal(after[10:], before[10:])
@@ -0,0 +1,75 @@
+from pathlib import Path
+from shutil import copytree
+import subprocess
+import sys
+
+from pintFoam.control_dict import template, load_template, write_control_dict
+from pintFoam.vector import BaseCase
+
+control_dict = b"""FoamFile
+{
+    version     2.0;
+    object      controlDict;
+}
+// startTime 3;
+application     icoFoam;
+startTime       0;
+endTime         1;   // end of the run
+deltaT          0.01;
+writeControl    timeStep;
+
+functions
+{
+    probes
+    {
+        writeControl    timeStep;
+        writeInterval   1;
+    }
+}
+"""
+
+values = dict(startFrom="latestTime", startTime=1.0, endTime=2.5, deltaT=1e-5,
+              writeControl="runTime", writeInterval=1.5)
+
+
+def test_template():
+    t = template(control_dict)
+    assert t.keys == ("startTime", "endTime", "deltaT", "writeControl",
+                      "startFrom", "writeInterval")
+    text = t.render(values).decode()
+    assert "// startTime 3;" in text
+    assert "startTime       1.0;" in text
+    assert "endTime         2.5;   // end of the run" in text
+    assert "deltaT          1e-05;" in text
+    assert "writeControl    runTime;\n\nfunctions" in text
+    assert "        writeControl    timeStep;\n        writeInterval   1;" in text
+    assert text.endswith("startFrom       latestTime;\nwriteInterval   1.5;\n")
+
+
+def test_write_control_dict(tmp_path):
+    path = tmp_path / "controlDict"
+    path.write_bytes(control_dict)
+    path.chmod(0o640)
+    t = load_template(path)
+    assert load_template(path) is t
+    write_control_dict(path, t, **values)
+    assert path.stat().st_mode & 0o777 == 0o640
+    assert list(tmp_path.iterdir()) == [path]
+    assert load_template(path) is not t
+
+
+def test_base_case(tmp_path):
+    copytree(Path(".") / "test" / "cases" / "pitzDaily", tmp_path / "base")
+    base_case = BaseCase(tmp_path, "base", fields=["U"])
+    x = base_case.new_vector()
+    write_control_dict(x.path / "system" / "controlDict", base_case.control_dict_template(),
+                       **values)
+    text = (x.path / "system" / "controlDict").read_text()
+    assert "startFrom       latestTime;" in text
+    assert "writeControl    runTime;" in text
+    assert "purgeWrite      0;" in text
+
+
+def test_no_pyfoam_import():
+    code = "import sys, pintFoam.foam; assert 'PyFoam' not in sys.modules"
+    subprocess.run([sys.executable, "-c", code], check=True)
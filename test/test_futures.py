@@ -2,16 +2,21 @@
 # ~\~ begin <<lit/parafutures.md|test/test_futures.py>>[init]
 from dataclasses import dataclass, field
 from functools import partial
+import io
+import json
 import logging
 from numpy.typing import NDArray
 import numpy as np
+import pytest
 
 from pintFoam.parareal.futures import Parareal
+from pintFoam.parareal.checkpoint import Checkpoint
 from pintFoam.parareal.harmonic_oscillator import harmonic_oscillator
 from pintFoam.parareal.forward_euler import forward_euler
 from pintFoam.parareal.iterate_solution import iterate_solution
 from pintFoam.parareal.tabulate_solution import tabulate
 
+import dask
 from dask.distributed import Client  # type: ignore
 
 
@@ -41,8 +46,13 @@ class History:
         return np.allclose(self.history[-1], self.history[-2], atol=1e-4)
 
 
-def test_parareal():
-    client = Client()
+@pytest.fixture
+def client():
+    with Client() as client:
+        yield client
+
+
+def test_parareal(client):
     p = Parareal(client, lambda n: partial(coarse, n), lambda n: partial(fine, n))
     t = np.linspace(0.0, 15.0, 30)
     y0 = np.array([0.0, 1.0])
@@ -50,6 +60,128 @@ def test_parareal():
     jobs = p.schedule(y0, t)
     p.wait(jobs, history.convergence_test)
 
+
+def test_run(client):
+    p = Parareal(client, lambda n: partial(coarse, n), lambda n: partial(fine, n))
+    t = np.linspace(0.0, 15.0, 30)
+    y0 = np.array([0.0, 1.0])
+    history = History()
+    result = p.run(y0, t, history.convergence_test, lookahead=2)
+    assert len(history.history) < t.size
+    assert np.allclose(np.array(result), tabulate(partial(fine, 0), y0, t), atol=1e-3)
+
+
+def test_frozen(client):
+    p = Parareal(client, lambda n: partial(coarse, n), lambda n: partial(fine, n),
+                 tolerance=1e-4)
+    t = np.linspace(0.0, 15.0, 30)
+    y0 = np.array([0.0, 1.0])
+    y_init = p.initial(y0, t)
+    y_next = p.step(1, y_init, t, frozen=5)
+    assert [f.key for f in y_next[:5]] == [f.key for f in y_init[:5]]
+    assert p.frozen(1, y_init, y_next) == 5
+
+    result = p.run(y0, t)
+    assert np.allclose(np.array(result), tabulate(partial(fine, 0), y0, t), atol=1e-3)
+
+
+def test_coarse_reuse(client):
+    n_coarse = []
+
+    def counted_coarse(n):
+        n_coarse.append(n)
+        return partial(coarse, n)
+
+    p = Parareal(client, counted_coarse, lambda n: partial(fine, n))
+    t = np.linspace(0.0, 15.0, 30)
+    y0 = np.array([0.0, 1.0])
+    y_init = p.initial(y0, t)
+    g = [None] + y_init[1:]
+    del n_coarse[:]
+    y_1 = p.step(1, y_init, t, g=g)
+    assert len(n_coarse) == t.size - 2
+    y_2 = p.step(2, y_1, t, g=g)
+    assert len(n_coarse) == 2 * (t.size - 2) - 1
+    assert np.allclose(np.array(client.gather(y_2)),
+                       np.array(client.gather(p.step(2, p.step(1, y_init, t), t))))
+
+@pytest.fixture
+def scheduler_errors():
+    """Errors logged by Dask, for instance by the scheduler, which are not
+    raised in the client."""
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setLevel(logging.ERROR)
+    logger = logging.getLogger("distributed")
+    logger.addHandler(handler)
+    yield stream
+    logger.removeHandler(handler)
+
+
+@pytest.mark.parametrize("tolerance,lookahead", [(1e-4, 1), (1e-4, 3), (None, 2)])
+def test_pipeline(tolerance, lookahead, scheduler_errors):
+    t = np.linspace(0.0, 15.0, 30)
+    y0 = np.array([0.0, 1.0])
+    with Client() as client:
+        p = Parareal(client, lambda n: partial(coarse, n), lambda n: partial(fine, n),
+                     tolerance=tolerance)
+        result = p.pipeline(y0, t, lookahead=lookahead)
+    assert np.allclose(np.array(result), tabulate(partial(fine, 0), y0, t), atol=1e-3)
+    assert scheduler_errors.getvalue() == ""
+
+def test_checkpoint(tmp_path):
+    n_fine = []
+
+    def counted_fine(n):
+        n_fine.append(n)
+        return partial(fine, n)
+
+    def parareal(client, path):
+        return Parareal(client, lambda n: partial(coarse, n), counted_fine,
+                        tolerance=1e-4, checkpoint=Checkpoint(path))
+
+    t = np.linspace(0.0, 15.0, 30)
+    y0 = np.array([0.0, 1.0])
+    with Client() as client:
+        result = parareal(client, tmp_path / "run.jsonl").run(y0, t)
+    n_total = len(n_fine)
+
+    with Client() as client:
+        # resume after a complete run: only the lookahead is scheduled again
+        del n_fine[:]
+        p = parareal(client, tmp_path / "run.jsonl")
+        assert np.array_equal(np.array(p.run(y0, t)), np.array(result))
+        assert min(n_fine) > p.checkpoint.last_iteration
+
+        # resume from a run that was interrupted in iteration 3
+        lines = (tmp_path / "run.jsonl").read_text().splitlines(keepends=True)
+        kept = [line for line in lines if json.loads(line).get("k", 0) < 3]
+        (tmp_path / "interrupted.jsonl").write_text("".join(kept) + lines[-1][:10])
+        del n_fine[:]
+        assert np.array_equal(
+            np.array(parareal(client, tmp_path / "interrupted.jsonl").run(y0, t)),
+            np.array(result))
+    assert 0 < len(n_fine) < n_total
+    assert min(n_fine) == 3
+
+def test_placement():
+    with dask.config.set({"distributed.scheduler.work-stealing": False}), \
+         Client(n_workers=2, threads_per_worker=2,
+                resources={"coarse": 1, "fine": 1}) as client:
+        p = Parareal(client, lambda n: partial(coarse, n), lambda n: partial(fine, n),
+                     coarse_resources={"coarse": 1}, fine_resources={"fine": 1})
+        t = np.linspace(0.0, 15.0, 30)
+        y0 = np.array([0.0, 1.0])
+        y_1 = p.step(1, p.initial(y0, t), t)
+        client.gather(y_1)
+        assert p.placement == sorted(p.placement)
+        assert set(p.placement) == set(client.nthreads())
+        who_has = client.who_has(y_1[1:])
+        assert all(p.placement[i] in who_has[y_1[i].key] for i in range(1, t.size))
+
+        result = p.run(y0, t)
+        assert np.allclose(np.array(result), tabulate(partial(fine, 0), y0, t), atol=1e-3)
+
 if __name__ == "__main__":
     logging.basicConfig(level=logging.DEBUG)
     y0 = np.array([1.0, 0.0])
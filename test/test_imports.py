@@ -0,0 +1,84 @@
+import json
+import subprocess
+import sys
+import pytest
+
+# Worker processes import `pintFoam.foam`; none of these modules should be
+# imported with it, or with the other entry points.
+modules = ["pintFoam", "pintFoam.foam", "pintFoam.clean", "pintFoam.parareal"]
+
+# Time that importing a module may take in a fresh interpreter, in units of
+# the time taken by `import numpy`, so that the budget scales with the speed
+# of the machine.
+budget = {"pintFoam": 0.5, "pintFoam.foam": 4.0, "pintFoam.clean": 4.0,
+          "pintFoam.parareal": 0.5}
+
+heavy = ["PyFoam", "byteparsing", "dask", "distributed", "matplotlib", "h5py", "mpi4py"]
+
+measure = """
+import json, sys
+before = set(sys.modules)
+import {module}
+print(json.dumps({{"modules": sorted(set(sys.modules) - before)}}))
+"""
+
+
+def import_stats(module):
+    result = subprocess.run([sys.executable, "-c", measure.format(module=module)],
+                            check=True, capture_output=True, text=True)
+    return json.loads(result.stdout)
+
+
+def import_time(module, repeat=5):
+    """Best of `repeat` cumulative import times of `module`, in microseconds,
+    as reported by `python -X importtime`. Modules imported at interpreter
+    startup are not counted."""
+    def top_level(statement):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                                check=True, capture_output=True, text=True)
+        times = {}
+        for line in result.stderr.splitlines():
+            fields = line.removeprefix("import time:").split("|")
+            if len(fields) == 3 and fields[1].strip().isdigit() \
+                    and not fields[2].startswith("  "):
+                times[fields[2].strip()] = int(fields[1])
+        return times
+
+    startup = set(top_level("pass"))
+    return min(sum(t for name, t in top_level(f"import {module}").items()
+                   if name not in startup)
+               for _ in range(repeat))
+
+
+@pytest.mark.parametrize("module", budget)
+def test_import_budget(module):
+    baseline = import_time("numpy")
+    if baseline == 0:
+        pytest.skip("numpy is imported at interpreter startup")
+    assert import_time(module) < budget[module] * baseline
+
+
+@pytest.mark.parametrize("module", modules)
+def test_heavy_imports(module):
+    loaded = {m.split(".")[0] for m in import_stats(module)["modules"]}
+    assert not loaded & set(heavy)
+
+
+def test_lazy_attributes():
+    stats = import_stats("pintFoam")
+    assert "numpy" not in stats["modules"]
+
+    import pintFoam
+    from pintFoam.vector import BaseCase
+    assert pintFoam.BaseCase is BaseCase
+    assert callable(pintFoam.foam)
+    import pintFoam.foam
+    assert callable(pintFoam.foam)
+    assert "Vector" in dir(pintFoam)
+    with pytest.raises(AttributeError):
+        pintFoam.does_not_exist
+
+    import pintFoam.parareal
+    from pintFoam.parareal.parareal import parareal
+    assert pintFoam.parareal.parareal is parareal
+    assert "abstract" in dir(pintFoam.parareal)
@@ -0,0 +1,100 @@
+from pathlib import Path
+from shutil import copytree
+import json
+import subprocess
+import sys
+import uuid
+import pytest
+
+from pintFoam import instrument
+from pintFoam.vector import BaseCase
+from pintFoam.foam import foam
+from pintFoam.utils import generate_job_name
+
+fake_solver = """#!{python}
+import time
+from pathlib import Path
+from shutil import copytree
+
+print("Create mesh", flush=True)
+time.sleep(0.05)
+print("Starting time loop", flush=True)
+data = bytearray(10_000_000)
+latest = max((p for p in Path().iterdir() if p.name[0].isdigit()), key=lambda p: float(p.name))
+copytree(latest, "{{:g}}".format(float(latest.name) + 1))
+print("End", flush=True)
+"""
+
+
+def test_events():
+    with instrument.collect() as sink:
+        with instrument.record("test", "3-abc") as event:
+            with event.phase("a"):
+                pass
+            with event.phase("a"):
+                pass
+        with pytest.raises(RuntimeError):
+            with instrument.record("test", "4-abc"):
+                raise RuntimeError("failed")
+    assert not instrument.enabled()
+    assert [e.case for e in sink.events] == ["3-abc", "4-abc"]
+    assert list(sink.events[0].phases) == ["a"]
+    assert sink.events[1].error == "RuntimeError('failed')"
+    assert [instrument.iteration_of(e) for e in sink.events] == [3, 4]
+
+
+def test_run(tmp_path):
+    event = instrument.Event("test", "")
+    with pytest.raises(subprocess.CalledProcessError):
+        instrument.run([sys.executable, "-c", "raise SystemExit(3)"], event, cwd=tmp_path)
+    assert event.max_rss > 0
+    assert event.cpu_time >= 0
+
+
+def test_run_undecodable_output(tmp_path):
+    event = instrument.Event("test", "")
+    script = "import sys; sys.stdout.buffer.write(b'\\xff\\xfe\\nStarting time loop\\n')"
+    with open(tmp_path / "log.stdout", "w") as log:
+        instrument.run([sys.executable, "-c", script], event, cwd=tmp_path, stdout=log,
+                       startup_marker="Starting time loop")
+    assert "startup" in event.phases
+    assert "Starting time loop" in (tmp_path / "log.stdout").read_text()
+
+
+def test_foam(tmp_path):
+    data = Path(".") / "test" / "cases" / "pitzDaily"
+    copytree(data, tmp_path / "base")
+    solver = tmp_path / "fakeFoam"
+    solver.write_text(fake_solver.format(python=sys.executable))
+    solver.chmod(0o755)
+    base_case = BaseCase(tmp_path, "base", fields=["U"])
+
+    events_file = tmp_path / "events.jsonl"
+    sink = instrument.JsonLinesSink(events_file)
+    instrument.add_sink(sink)
+    try:
+        with instrument.collect() as memory:
+            x = base_case.new_vector()
+            for t in range(2):
+                name = generate_job_name(t + 1, t, t + 1, uuid.uuid4(), "fine")
+                x = foam(str(solver), 0.1, x, t, t + 1, job_name=name)
+    finally:
+        instrument.remove_sink(sink)
+
+    assert [e.kind for e in memory.events] == ["foam", "foam"]
+    for e in memory.events:
+        assert e.error is None
+        assert {"reduce", "clone", "control_dict", "startup", "solve", "get_times"} \
+            <= set(e.phases)
+        assert e.phases["startup"] >= 0.05
+        assert e.max_rss >= 10_000
+        assert e.bytes_written > 0
+    assert "Starting time loop" in (x.path / "log.stdout").read_text()
+
+    lines = [json.loads(line) for line in events_file.read_text().splitlines()]
+    assert [line["case"] for line in lines] == [e.case for e in memory.events]
+
+    s = instrument.summary(memory.events)
+    assert set(s) == {1, 2}
+    assert s[1]["calls"] == {"foam": 1}
+    assert "iteration 2: 1 foam" in instrument.report(memory.events)
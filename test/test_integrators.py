@@ -0,0 +1,40 @@
+import numpy as np
+
+from pintFoam.parareal.harmonic_oscillator import harmonic_oscillator, underdamped_solution
+from pintFoam.parareal.iterate_solution import iterate_solution
+from pintFoam.parareal.leapfrog import leapfrog
+from pintFoam.parareal.runge_kutta import runge_kutta_4, dormand_prince
+from pintFoam.parareal.tabulate_solution import tabulate
+
+
+OMEGA0 = 1.0
+ZETA = 0.5
+system = harmonic_oscillator(OMEGA0, ZETA)
+exact = underdamped_solution(OMEGA0, ZETA)
+t = np.linspace(0.0, 15.0, 30)
+y0 = np.array([1.0, 0.0])
+
+
+def test_runge_kutta_4():
+    y = tabulate(iterate_solution(runge_kutta_4(system), 0.1), y0, t)
+    assert np.abs(y - exact(t)).max() < 1e-6
+
+
+def test_dormand_prince():
+    n_evals = []
+
+    def f(y, t):
+        n_evals.append(t)
+        return system(y, t)
+
+    y = tabulate(dormand_prince(f, rtol=1e-8, atol=1e-11), y0, t)
+    assert np.abs(y - exact(t)).max() < 1e-7
+    # about 1/h evaluations for forward Euler with a (much worse) error of 1e-3
+    assert len(n_evals) < 15.0 / 0.001 / 10
+
+
+def test_leapfrog():
+    undamped = harmonic_oscillator(OMEGA0, 0.0)
+    y = tabulate(iterate_solution(leapfrog(undamped), 0.1), y0, np.linspace(0.0, 1000.0, 11))
+    assert np.allclose((y**2).sum(axis=1), 1.0, atol=1e-2)
+    assert np.allclose(y[:, 0], np.cos(np.linspace(0.0, 1000.0, 11)), atol=0.5)
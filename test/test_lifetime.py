@@ -0,0 +1,76 @@
+from functools import partial
+from math import exp
+import time
+import numpy as np
+
+from pintFoam.benchmarks.vector_io import synthetic_case
+from pintFoam.lifetime import Lifetime, case_path
+from pintFoam.parareal.futures import Parareal
+
+
+def cases(root, base_case):
+    return {str(p.resolve()) for p in root.iterdir()
+            if p.is_dir() and p.name != base_case.case}
+
+
+def run(tmp_path, client, coarse, fine, lifetime):
+    base_case = synthetic_case(tmp_path, 100, [("p", "scalar")])
+    y0 = base_case.new_vector()
+    p = Parareal(client, lambda n: coarse, lambda n: fine,
+                 tolerance=1e-8, lifetime=lifetime)
+    t = np.linspace(0.0, 1.0, 9)
+    return base_case, y0, t, p.run(y0, t)
+
+
+def test_case_path(tmp_path):
+    base_case = synthetic_case(tmp_path, 10, [("p", "scalar")])
+    x = base_case.new_vector()
+    assert case_path(x) == str(x.path.resolve())
+    assert case_path(np.zeros(3)) is None
+    lifetime = Lifetime()
+    lifetime.pin(x)
+    assert lifetime.release([case_path(x)], []) == 0
+    assert x.path.exists()
+
+
+def test_lifetime(tmp_path, client, coarse, fine):
+    base_case, y0, t, result = run(tmp_path / "kept", client, coarse, fine, None)
+    n_kept = len(cases(tmp_path / "kept", base_case))
+
+    lifetime = Lifetime()
+    base_case, y0, t, result = run(tmp_path / "collected", client, coarse, fine, lifetime)
+    remaining = cases(tmp_path / "collected", base_case)
+    assert lifetime.deleted
+    assert not lifetime.deleted & remaining
+    assert len(remaining) < n_kept / 2
+    assert {case_path(y) for y in result} <= remaining
+    assert case_path(y0) in remaining
+
+    p0 = y0.read_data("p")
+    for t_i, y in zip(t, result):
+        assert np.allclose(y.read_data("p"), p0 * exp(-t_i))
+
+
+def slow(fine, x, t_0, t_1):
+    time.sleep(0.3)
+    return fine(x, t_0, t_1)
+
+
+class Stalling(Parareal):
+    """The frozen prefix runs ahead of the exact front, and stays at the same
+    slice for two iterations."""
+    def frozen(self, n_iter, y_prev, y_next, frozen=0):
+        result = super().frozen(n_iter, y_prev, y_next, frozen)
+        return max(result, 6) if n_iter in (1, 2) else result
+
+
+def test_stalled_prefix(tmp_path, client, coarse, fine):
+    base_case = synthetic_case(tmp_path, 100, [("p", "scalar")])
+    y0 = base_case.new_vector()
+    lifetime = Lifetime()
+    p = Stalling(client, lambda n: coarse, lambda n: partial(slow, fine),
+                 tolerance=1e-8, lifetime=lifetime)
+    result = p.run(y0, np.linspace(0.0, 1.0, 11), lookahead=1)
+    assert lifetime.deleted
+    for y in result:
+        assert y.read_data("p").shape == (100,)
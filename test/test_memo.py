@@ -0,0 +1,98 @@
+from pathlib import Path
+from shutil import copytree
+import sys
+
+from pintFoam.vector import BaseCase
+from pintFoam.foam import foam
+from pintFoam.memo import ResultCache
+from pintFoam.memory import FieldVector
+
+fake_solver = """#!{python}
+from pathlib import Path
+from shutil import copytree
+
+with open("../runs", "a") as f:
+    print(Path().resolve().name, file=f)
+latest = max((p for p in Path().iterdir() if p.name[0].isdigit()), key=lambda p: float(p.name))
+copytree(latest, "{{:g}}".format(float(latest.name) + 1))
+"""
+
+
+def setup_case(tmp_path):
+    copytree(Path(".") / "test" / "cases" / "pitzDaily", tmp_path / "base")
+    solver = tmp_path / "fakeFoam"
+    solver.write_text(fake_solver.format(python=sys.executable))
+    solver.chmod(0o755)
+    return BaseCase(tmp_path, "base", fields=["U"]), str(solver)
+
+
+def test_result_cache(tmp_path):
+    base_case, solver = setup_case(tmp_path)
+    result_cache = ResultCache(tmp_path / "cache")
+    runs = tmp_path / "runs"
+
+    x = base_case.new_vector()
+    y1 = foam(solver, 0.1, x, 0, 1, result_cache=result_cache)
+    y2 = foam(solver, 0.1, x, 0, 1, job_name="again", result_cache=result_cache)
+    assert len(runs.read_text().splitlines()) == 1
+    assert y2.case == "again" and y2.time == y1.time == "1"
+    assert (y2.dirname / "U").read_bytes() == (y1.dirname / "U").read_bytes()
+    assert (result_cache.hits, result_cache.misses) == (1, 1)
+
+    foam(solver, 0.2, x, 0, 1, result_cache=result_cache)
+    (x.dirname / "U").write_bytes((x.dirname / "U").read_bytes() + b"\n")
+    foam(solver, 0.1, x, 0, 1, result_cache=result_cache)
+    assert len(runs.read_text().splitlines()) == 3
+    assert result_cache.stats["entries"] == 3
+
+
+def test_materialized_input(tmp_path):
+    base_case, solver = setup_case(tmp_path)
+    base_case.set_write_format("binary")
+    result_cache = ResultCache(tmp_path / "cache")
+    x = base_case.new_vector()
+    foam(solver, 0.1, x, 0, 1, result_cache=result_cache)
+    cases = set(base_case.all_vector_paths())
+
+    y = foam(solver, 0.1, x * 1.0, 0, 1, result_cache=result_cache)
+    assert result_cache.hits == 1
+    assert set(base_case.all_vector_paths()) == cases | {y.path}
+    z = foam(solver, 0.1, FieldVector.load(x), 0, 1, job_name="named",
+             result_cache=result_cache)
+    assert result_cache.hits == 2
+    assert [p.name for p in z.path.iterdir() if p.name[0].isdigit()] == ["1"]
+
+
+def test_eviction(tmp_path):
+    base_case, solver = setup_case(tmp_path)
+    x = base_case.new_vector()
+    result_cache = ResultCache(tmp_path / "cache")
+    y = foam(solver, 0.1, x, 0, 1, result_cache=result_cache)
+    entry_size = result_cache.stats["nbytes"]
+    assert entry_size > 0
+
+    result_cache.max_bytes = 2 * entry_size
+    y = foam(solver, 0.1, y, 1, 2, result_cache=result_cache)
+    foam(solver, 0.1, x, 0, 1, result_cache=result_cache)     # touches the first entry
+    foam(solver, 0.1, y, 2, 3, result_cache=result_cache)     # evicts the second
+    assert result_cache.stats["entries"] == 2
+    assert result_cache.lookup(result_cache.key(
+        x, solver=solver, dt=0.1, t_0=0.0, t_1=1.0, write_interval=1.0,
+        write_control="runTime"), base_case) is not None
+
+
+def test_case_setup(tmp_path):
+    base_case, solver = setup_case(tmp_path)
+    result_cache = ResultCache(tmp_path / "cache")
+    x = base_case.new_vector()
+    key = result_cache.key(x, solver=solver, dt=0.1)
+    assert result_cache.key(x, solver=solver, dt=0.1) == key
+
+    keys = {key}
+    for path in [base_case.path / "system" / "fvSchemes",
+                 base_case.path / "constant" / "transportProperties",
+                 x.dirname / "phi"]:
+        with open(path, "a") as f:
+            f.write("// changed\n")
+        keys.add(result_cache.key(x, solver=solver, dt=0.1))
+    assert len(keys) == 4
@@ -0,0 +1,54 @@
+from math import exp
+import pickle
+import numpy as np
+
+from pintFoam.benchmarks.vector_io import synthetic_case
+from pintFoam.memory import FieldVector, in_memory
+from pintFoam.parareal.futures import Parareal
+
+
+def test_field_vector(tmp_path, fields, snapshot):
+    base_case = synthetic_case(tmp_path, 1000, fields)
+    x = base_case.new_vector()
+    a = FieldVector.load(x)
+    n_cases = len(list(base_case.all_vector_paths()))
+
+    b = 3 * a - a * 0.5 + a
+    assert isinstance(b, FieldVector)
+    assert (b - a).reduce() is not a
+    for f, _ in fields:
+        assert np.allclose(b.read_data(f), 3.5 * x.read_data(f))
+    assert np.isclose((b - a).norm(), 2.5 * max(np.abs(x.read_data(f)).max() for f, _ in fields))
+    assert len(list(base_case.all_vector_paths())) == n_cases
+
+    y = (a + x).reduce()
+    assert np.allclose(y.read_data("U"), 2 * x.read_data("U"))
+    assert snapshot(a.materialize()) == snapshot(x)
+
+
+def test_pickle(tmp_path, fields):
+    base_case = synthetic_case(tmp_path, 10000, fields)
+    a = FieldVector.load(base_case.new_vector())
+    buffers = []
+    payload = pickle.dumps(a, protocol=5, buffer_callback=buffers.append)
+    assert len(buffers) == len(fields)
+    assert len(payload) < sum(v.nbytes for v in a.data.values()) / 10
+    b = pickle.loads(payload, buffers=buffers)
+    assert b.dirname == a.dirname
+    for f, _ in fields:
+        assert np.array_equal(b.read_data(f), a.read_data(f))
+
+
+def test_parareal(tmp_path, client, coarse, fine):
+    base_case = synthetic_case(tmp_path, 100, [("p", "scalar")])
+    x0 = base_case.new_vector()
+    y0 = FieldVector.load(x0)
+    p = Parareal(client, lambda n: in_memory(coarse), lambda n: in_memory(fine),
+                 tolerance=1e-8)
+    t = np.linspace(0.0, 1.0, 5)
+    result = p.run(y0, t)
+
+    assert all(isinstance(y, FieldVector) for y in result)
+    p0 = x0.read_data("p")
+    for t_i, y in zip(t, result):
+        assert np.allclose(y.read_data("p"), p0 * exp(-t_i))
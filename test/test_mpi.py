@@ -0,0 +1,83 @@
+# ~\~ language=Python filename=test/test_mpi.py
+# ~\~ begin <<lit/parafutures.md|test/test_mpi.py>>[init]
+import os
+import shutil
+import subprocess
+import sys
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from pintFoam.parareal import parareal, tabulate
+from pintFoam.parareal.harmonic_oscillator import harmonic_oscillator
+from pintFoam.parareal.forward_euler import forward_euler
+from pintFoam.parareal.iterate_solution import iterate_solution
+
+OMEGA0 = 1.0
+ZETA = 0.5
+H = 0.01
+system = harmonic_oscillator(OMEGA0, ZETA)
+
+
+def coarse(_, y, t0, t1):
+    return forward_euler(system)(y, t0, t1)
+
+
+def fine(_, y, t0, t1):
+    return iterate_solution(forward_euler(system), H)(y, t0, t1)
+
+
+t = np.linspace(0.0, 4.0, 5)
+y0 = np.array([0.0, 1.0])
+
+
+def sequential(n_iter):
+    y = tabulate(partial(coarse, 0), y0, t)
+    for n in range(1, n_iter + 1):
+        y = np.array(parareal(partial(coarse, n), partial(fine, n))(y, t))
+    return y
+
+
+def mpirun(tmp_path, *args):
+    mpirun = shutil.which("mpirun")
+    if mpirun is None:
+        pytest.skip("mpirun not found")
+    env = dict(os.environ, OMPI_ALLOW_RUN_AS_ROOT="1", OMPI_ALLOW_RUN_AS_ROOT_CONFIRM="1",
+               OMPI_MCA_rmaps_base_oversubscribe="1",
+               PYTHONPATH=os.pathsep.join([str(Path.cwd()), os.environ.get("PYTHONPATH", "")]))
+    subprocess.run([mpirun, "-n", str(t.size - 1), sys.executable, __file__,
+                    str(tmp_path / "result.npy"), *map(str, args)],
+                   env=env, check=True, timeout=300)
+    return np.load(tmp_path / "result.npy")
+
+
+def test_mpi_iterations(tmp_path):
+    for n_iter in [1, 2]:
+        assert np.allclose(mpirun(tmp_path, n_iter), sequential(n_iter))
+
+
+def test_mpi_exact(tmp_path):
+    assert np.allclose(mpirun(tmp_path), tabulate(partial(fine, 0), y0, t))
+
+
+def test_mpi_ranks():
+    from pintFoam.parareal.mpi import Parareal
+    p = Parareal(lambda n: partial(coarse, n), lambda n: partial(fine, n))
+    with pytest.raises(ValueError):
+        p.run(y0, np.linspace(0.0, 1.0, p.comm.Get_size() + 2))
+
+
+def main(output, max_iter=None):
+    from pintFoam.parareal.mpi import Parareal
+    p = Parareal(lambda n: partial(coarse, n), lambda n: partial(fine, n),
+                 tolerance=None if max_iter is not None else 1e-12)
+    result = p.run(y0, t, max_iter=None if max_iter is None else int(max_iter))
+    if p.comm.Get_rank() == 0:
+        np.save(output, np.array(result))
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
+# ~\~ end
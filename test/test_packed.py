@@ -0,0 +1,60 @@
+from functools import partial
+from math import exp
+import numpy as np
+import pytest
+
+from pintFoam.benchmarks.vector_io import synthetic_case
+from pintFoam.instrument import directory_size
+from pintFoam.packed import PackedVector, pack
+from pintFoam.parareal.futures import Parareal
+
+
+@pytest.mark.parametrize("codec", [None, "zlib", "zstd", "blosc"])
+def test_lossless(tmp_path, codec, fields, snapshot):
+    if codec in ("zstd", "blosc"):
+        pytest.importorskip({"zstd": "zstandard", "blosc": "blosc"}[codec])
+    base_case = synthetic_case(tmp_path, 1000, fields)
+    x = base_case.new_vector()
+    y = pack(x, dtype=None, codec=codec)
+    assert isinstance(y, PackedVector) and y.dirname.is_file()
+    for f, _ in fields:
+        assert np.array_equal(y.read_data(f), x.read_data(f))
+    assert snapshot(y.unpack()) == snapshot(x)
+
+
+def test_single_precision(tmp_path, fields):
+    base_case = synthetic_case(tmp_path, 1000, fields)
+    x = base_case.new_vector()
+    y = pack(x)
+    assert y.dirname.stat().st_size < 0.6 * directory_size(x.dirname)
+    for f, _ in fields:
+        assert y.read_data(f).dtype == np.float64
+        assert np.allclose(y.read_data(f), x.read_data(f), rtol=1e-6, atol=0)
+
+    z = (y + x - y).reduce()
+    assert z.path != y.path
+    for f, _ in fields:
+        assert np.allclose(z.read_data(f), x.read_data(f), rtol=1e-6, atol=0)
+    assert (y - x).norm() < 1e-6
+
+    w = pack(2 * y - x, remove=True)
+    assert y.path.exists()
+    assert np.allclose(w.read_data("p"), x.read_data("p"), rtol=1e-6, atol=0)
+    v = x.clone()
+    pack(v, remove=True)
+    assert not v.path.exists()
+
+
+def test_parareal(tmp_path, client, coarse, fine):
+    base_case = synthetic_case(tmp_path, 100, [("p", "scalar")])
+    y0 = base_case.new_vector()
+    p = Parareal(client, lambda n: coarse, lambda n: fine, tolerance=1e-5,
+                 pack=partial(pack, remove=True))
+    t = np.linspace(0.0, 1.0, 5)
+    result = p.run(y0, t)
+
+    packed = [d for d in tmp_path.iterdir() if any(d.glob("*.npz"))]
+    assert packed
+    p0 = y0.read_data("p")
+    for t_i, y in zip(t, result):
+        assert np.allclose(y.read_data("p"), p0 * exp(-t_i), rtol=1e-5)
@@ -0,0 +1,52 @@
+from pathlib import Path
+from shutil import copytree
+import sys
+import pytest
+
+from pintFoam.vector import (BaseCase, Vector)
+from pintFoam.foam import foam
+from pintFoam.session import (SolverSession, SessionError)
+
+fake_solver = """
+import json, sys
+from pathlib import Path
+from shutil import copytree
+
+with open("starts", "a") as f:
+    print("started", file=f)
+
+for line in sys.stdin:
+    job = json.loads(line)
+    if job["endTime"] < job["startTime"]:
+        print(json.dumps({"status": "error", "message": "negative interval"}), flush=True)
+        continue
+    case = Path(job["case"])
+    latest = max((p for p in case.iterdir() if p.name[0].isdigit()), key=lambda p: float(p.name))
+    copytree(latest, case / f"{job['endTime']:g}")
+    print(json.dumps({"status": "ok"}), flush=True)
+"""
+
+
+def test_session(tmp_path):
+    data = Path(".") / "test" / "cases" / "pitzDaily"
+    copytree(data, tmp_path / "base")
+    (tmp_path / "solver.py").write_text(fake_solver)
+    base_case = BaseCase(tmp_path, "base", fields=["U"])
+
+    with SolverSession([sys.executable, str(tmp_path / "solver.py")], tmp_path,
+                       solver="fakeFoam", base=base_case.path) as session:
+        x = base_case.new_vector()
+        for t in range(3):
+            x = foam("fakeFoam", 0.1, x, t, t + 1, session=session)
+            assert x.time == f"{t + 1}"
+            assert (x.dirname / "U").exists()
+
+        with pytest.raises(SessionError):
+            session.run(x.path, 3, 2, 0.1)
+        with pytest.raises(ValueError):
+            foam("icoFoam", 0.1, x, 3, 4, session=session)
+        other = BaseCase(tmp_path, "other", fields=["U"])
+        with pytest.raises(ValueError):
+            foam("fakeFoam", 0.1, Vector(other, "case", "0"), 0, 1, session=session)
+
+    assert (tmp_path / "starts").read_text().count("started") == 1
@@ -0,0 +1,69 @@
+import os
+from pathlib import Path
+from shutil import copytree, rmtree
+
+from pintFoam.vector import share
+from pintFoam.benchmarks.vector_io import synthetic_case
+
+fields = [("p", "scalar"), ("U", "vector")]
+
+
+def time_directories(path: Path):
+    return sorted(p.name for p in path.iterdir() if p.name[0].isdigit())
+
+
+def test_new_case(tmp_path):
+    base_case = synthetic_case(tmp_path, 100, fields)
+    x = base_case.new_vector()
+    assert (x.path / "constant").is_symlink()
+    assert (x.path / "constant").resolve() == (base_case.path / "constant").resolve()
+    assert (x.path / "constant" / "polyMesh" / "points").samefile(
+        base_case.path / "constant" / "polyMesh" / "points")
+
+    control_dict = x.path / "system" / "controlDict"
+    assert not control_dict.is_symlink()
+    assert not control_dict.samefile(base_case.path / "system" / "controlDict")
+    control_dict.write_text("changed")
+    assert (base_case.path / "system" / "controlDict").read_text() != "changed"
+
+
+def test_share_fallback(tmp_path, monkeypatch):
+    base_case = synthetic_case(tmp_path, 100, fields)
+
+    def no_symlink(*args, **kwargs):
+        raise OSError("symbolic links not supported")
+
+    monkeypatch.setattr(Path, "symlink_to", no_symlink)
+    target = tmp_path / "other" / "constant"
+    target.parent.mkdir()
+    share(base_case.path / "constant", target)
+    assert not target.is_symlink()
+    points = target / "polyMesh" / "points"
+    assert points.samefile(base_case.path / "constant" / "polyMesh" / "points")
+
+
+def test_clone(tmp_path):
+    base_case = synthetic_case(tmp_path, 100, fields)
+    x = base_case.new_vector()
+    copytree(x.dirname, x.path / "1")
+    y = x.clone()
+    assert y.path != x.path
+    assert time_directories(y.path) == ["0"]
+    assert (y.dirname / "U").read_bytes() == (x.dirname / "U").read_bytes()
+    assert not (y.dirname / "U").samefile(x.dirname / "U")
+
+
+def test_remove_cases(tmp_path):
+    base_case = synthetic_case(tmp_path, 100, fields)
+    points = base_case.path / "constant" / "polyMesh" / "points"
+    content = points.read_bytes()
+
+    x = base_case.new_vector()
+    rmtree(x.path)
+    assert points.read_bytes() == content
+
+    base_case.new_vector().clone()
+    base_case.clean()
+    assert list(base_case.all_vector_paths()) == []
+    assert points.read_bytes() == content
+    assert os.listdir(base_case.path / "0")